@@ -1,21 +1,11 @@
-from fastapi import FastAPI
-from app.api.routes import router
-from app.api.middleware import setup_middleware
+"""Feed.fun API. The app factory lives in ``app.factory`` and is loaded on
+first use, so processes that only need ``app.services`` (image workers,
+scripts) don't import FastAPI and every route."""
 
-def create_app() -> FastAPI:
-    """Create and configure a FastAPI application."""
-    app = FastAPI(
-        title="Feed.fun API",
-        description="API for Feed.fun - Where News Meets Memes in the World of Crypto",
-        version="1.0.0",
-        docs_url=None,  # Disable Swagger UI for production
-        redoc_url=None  # Disable ReDoc for production
-    )
-    
-    # Setup middleware
-    setup_middleware(app)
-    
-    # Include routers
-    app.include_router(router, prefix="/api/v1")
-    
-    return app
\ No newline at end of file
+
+def __getattr__(name: str):
+    if name in ("create_app", "lifespan"):
+        from app import factory
+
+        return getattr(factory, name)
+    raise AttributeError(f"module 'app' has no attribute '{name}'")
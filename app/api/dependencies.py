@@ -0,0 +1,75 @@
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import Depends, FastAPI, Request
+from app.config.settings import settings
+from app.services.admission import AdmissionController
+from app.services.jobs import JobManager
+from app.services.news_service import NewsService
+from app.services.news_to_ai_service import NewsToAIService
+from app.services.precompute import MemePrecomputer
+
+
+@dataclass
+class Services:
+    """Long-lived services shared by every request of one app."""
+    news_service: NewsService
+    news_to_ai_service: NewsToAIService
+    job_manager: JobManager
+    admission: AdmissionController
+    precomputer: Optional[MemePrecomputer] = None
+
+    # Start background workers; needs a running event loop
+    def start(self) -> None:
+        self.job_manager.start()
+        if self.precomputer is not None:
+            self.precomputer.start()
+
+    async def stop(self) -> None:
+        if self.precomputer is not None:
+            await self.precomputer.stop()
+        await self.job_manager.stop()
+        await self.news_to_ai_service.meme_cache.close()
+
+
+# Construct services from the current settings
+def build_services() -> Services:
+    news_service = NewsService()
+    news_to_ai_service = NewsToAIService()
+    precomputer = None
+    if settings.PRECOMPUTE_ENABLED:
+        precomputer = MemePrecomputer(news_service, news_to_ai_service)
+    return Services(
+        news_service=news_service,
+        news_to_ai_service=news_to_ai_service,
+        job_manager=JobManager(news_to_ai_service),
+        admission=AdmissionController(),
+        precomputer=precomputer
+    )
+
+
+# Services built by the lifespan, or on first use when it didn't run
+def services_for(app: FastAPI) -> Services:
+    services = getattr(app.state, "services", None)
+    if services is None:
+        services = app.state.services = build_services()
+    return services
+
+
+def get_services(request: Request) -> Services:
+    return services_for(request.app)
+
+
+def get_news_service(services: Services = Depends(get_services)) -> NewsService:
+    return services.news_service
+
+
+def get_news_to_ai_service(services: Services = Depends(get_services)) -> NewsToAIService:
+    return services.news_to_ai_service
+
+
+def get_job_manager(services: Services = Depends(get_services)) -> JobManager:
+    return services.job_manager
+
+
+def get_admission(services: Services = Depends(get_services)) -> AdmissionController:
+    return services.admission
@@ -1,57 +1,137 @@
-from fastapi import Request, HTTPException
-from typing import Callable
+from bisect import bisect_right
+from fastapi import HTTPException
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
 import time
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
 from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import ipaddress
+from app.services.metrics import (
+    HTTP_DURATION, HTTP_REQUESTS, server_timing_header, start_request_timings
+)
 
-class TimingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: Callable):
-        start_time = time.time()
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        response.headers["X-Process-Time"] = str(process_time)
-        return response
-
-class InternalOnlyMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, allowed_networks=None):
-        super().__init__(app)
-        self.allowed_networks = allowed_networks or [
-            ipaddress.ip_network("127.0.0.1/32"),  # localhost
-            ipaddress.ip_network("172.17.0.0/16"),    # docker0
-            ipaddress.ip_network("172.18.0.0/16"),    # docker bridge network
-            ipaddress.ip_network("172.19.0.0/16"),    # docker bridge network
-            ipaddress.ip_network("10.116.0.0/20"),    # eth1 private network
-        ]
-
-    async def dispatch(self, request: Request, call_next: Callable):
-        if not request.client:
-            return await call_next(request) # Allow for test client
-            
-        client_host = request.client.host
-
-        forwarded_for = request.headers.get('x-forwarded-for')
-        real_ip = request.headers.get('x-real-ip')
-
-        if forwarded_for or real_ip:
-            return await call_next(request)
-        
-        if client_host == "testclient":
-            return await call_next(request)
-            
+DEFAULT_ALLOWED_NETWORKS = [
+    ipaddress.ip_network("127.0.0.1/32"),  # localhost
+    ipaddress.ip_network("172.17.0.0/16"),    # docker0
+    ipaddress.ip_network("172.18.0.0/16"),    # docker bridge network
+    ipaddress.ip_network("172.19.0.0/16"),    # docker bridge network
+    ipaddress.ip_network("10.116.0.0/20"),    # eth1 private network
+]
+
+class TimingMiddleware:
+    """Pure ASGI: adds X-Process-Time and Server-Timing, records HTTP metrics.
+
+    Headers carry the time to the start of the response; the duration metric
+    covers the whole response, including streamed bodies.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = start_request_timings()
+        start_ns = time.perf_counter_ns()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                process_time = (time.perf_counter_ns() - start_ns) / 1e9
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Process-Time", str(process_time))
+                headers.append("Server-Timing", server_timing_header(timings, process_time))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Label by route template so IDs in paths don't explode cardinality
+            route_path = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            HTTP_REQUESTS.inc(method=method, route=route_path, status=str(status_code))
+            HTTP_DURATION.observe((time.perf_counter_ns() - start_ns) / 1e9, method=method, route=route_path)
+
+class IPAllowList:
+    """Allowed networks merged into sorted integer intervals per IP version.
+
+    Lookups are a bisect instead of a scan over every network, and recent
+    decisions are cached per client address.
+    """
+
+    def __init__(self, networks: Iterable, cache_size: int = 1024):
+        self._starts = {4: [], 6: []}
+        self._ends = {4: [], 6: []}
+        for version in (4, 6):
+            intervals = sorted(
+                (int(network.network_address), int(network.broadcast_address))
+                for network in networks if network.version == version
+            )
+            merged: List[Tuple[int, int]] = []
+            for start, end in intervals:
+                if merged and start <= merged[-1][1] + 1:
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+                else:
+                    merged.append((start, end))
+            self._starts[version] = [start for start, _ in merged]
+            self._ends[version] = [end for _, end in merged]
+        self.decide = lru_cache(maxsize=cache_size)(self._decide)
+
+    # True/False for a valid address, None if the host isn't an IP address
+    def _decide(self, host: str) -> Optional[bool]:
         try:
-            # Check if the client IP is in allowed networks
-            client_ip = ipaddress.ip_address(client_host)
-            is_allowed = any(client_ip in network for network in self.allowed_networks)
-            
-            if not is_allowed:
-                print(f"Access denied for IP: {client_ip}")
-                raise HTTPException(status_code=403, detail="Access denied")
-                
-            return await call_next(request)
+            ip = ipaddress.ip_address(host)
         except ValueError:
+            return None
+        if ip.version == 6 and ip.ipv4_mapped is not None:
+            ip = ip.ipv4_mapped
+        value = int(ip)
+        index = bisect_right(self._starts[ip.version], value) - 1
+        return index >= 0 and value <= self._ends[ip.version][index]
+
+class InternalOnlyMiddleware:
+    def __init__(self, app: ASGIApp, allowed_networks=None):
+        self.app = app
+        self.allowed_networks = allowed_networks or DEFAULT_ALLOWED_NETWORKS
+        self.allow_list = IPAllowList(self.allowed_networks)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        client = HTTPConnection(scope).client
+        if not client:
+            await self.app(scope, receive, send) # Allow for test client
+            return
+
+        client_host = client.host
+
+        for name, _ in scope["headers"]:
+            if name == b"x-forwarded-for" or name == b"x-real-ip":
+                await self.app(scope, receive, send)
+                return
+
+        if client_host == "testclient":
+            await self.app(scope, receive, send)
+            return
+
+        # Check if the client IP is in allowed networks
+        is_allowed = self.allow_list.decide(client_host)
+        if is_allowed is None:
             print(f"Invalid IP error")
             raise HTTPException(status_code=403, detail="Invalid IP address")
+        if not is_allowed:
+            print(f"Access denied for IP: {client_host}")
+            raise HTTPException(status_code=403, detail="Access denied")
+
+        await self.app(scope, receive, send)
 
 def setup_middleware(app):
     # Add CORS middleware with restrictive settings
@@ -61,12 +141,12 @@ def setup_middleware(app):
         allow_credentials=True,
         allow_methods=["GET", "POST"],
         allow_headers=["*"],
-        expose_headers=["X-Process-Time"]
-        
+        expose_headers=["X-Process-Time", "Server-Timing"]
+
     )
-    
+
     # Add timing middleware
     app.add_middleware(TimingMiddleware)
-    
+
     # Add internal-only middleware
-    app.add_middleware(InternalOnlyMiddleware)
\ No newline at end of file
+    app.add_middleware(InternalOnlyMiddleware)
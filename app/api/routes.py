@@ -1,19 +1,80 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from typing import Any, AsyncIterator, Awaitable, List
 from ..services.news_service import NewsService
 from ..services.news_to_ai_service import NewsToAIService
-from ..models.schemas import MemeResponse
+from ..services.jobs import JobManager
+from ..services.admission import AdmissionController, AdmissionRejected, AdmissionSlot
+from ..services.image_store import get_image_store
+from ..services.image_processing import IMAGE_FORMATS
+from ..services.metrics import REGISTRY
+from ..services.prompts import PROMPTS
+from ..models.schemas import MemeBatchResponse, MemeJob, MemeJobRequest, MemeResponse
+from .dependencies import (
+    get_admission, get_job_manager, get_news_service, get_news_to_ai_service, get_services
+)
 
 router = APIRouter()
-news_service = NewsService()
-news_to_ai_service = NewsToAIService()
+IMAGE_MEDIA_TYPES = dict(IMAGE_FORMATS.values())
+
+# Client identity for admission fairness; proxies pass the original address
+def client_id(request: Request) -> str:
+    forwarded_for = request.headers.get("x-forwarded-for")
+    if forwarded_for:
+        return forwarded_for.split(",")[0].strip()
+    return request.headers.get("x-real-ip") or (request.client.host if request.client else "unknown")
+
+# A shed request as 429/503 with Retry-After
+def rejected(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=e.status_code,
+        detail=e.detail,
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+# Take an admission slot, turning a rejection into 429/503 with Retry-After
+async def acquire_slot(request: Request) -> AdmissionSlot:
+    try:
+        return await get_services(request).admission.acquire(client_id(request))
+    except AdmissionRejected as e:
+        raise rejected(e)
+
+@asynccontextmanager
+async def admitted(request: Request) -> AsyncIterator[AdmissionSlot]:
+    slot = await acquire_slot(request)
+    try:
+        yield slot
+    finally:
+        slot.release()
+
+async def _wait_for_disconnect(request: Request) -> None:
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+# Await work, cancelling it if the client goes away first
+async def run_until_disconnect(request: Request, work: Awaitable[Any]) -> Any:
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+    if not task.done() or task.cancelled():
+        raise HTTPException(status_code=499, detail="Client closed request")
+    return task.result()
 
 @router.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
 @router.get("/news", response_model=List[dict])
-async def get_news():
+async def get_news(news_service: NewsService = Depends(get_news_service)):
     """Fetch latest news from the news service"""
     news = await news_service.fetch_news()
     if not news:
@@ -21,36 +82,194 @@ async def get_news():
     return news
 
 @router.get('/memes', response_model=List[MemeResponse])
-async def generate_memes():
+async def generate_memes(
+    request: Request,
+    news_service: NewsService = Depends(get_news_service),
+    news_to_ai_service: NewsToAIService = Depends(get_news_to_ai_service)
+):
     """Generate memes from latest news"""
     news_list = await news_service.fetch_news()
     if not news_list:
         raise HTTPException(status_code=404, detail="No news available for meme generation")
         
-    try:
-        memes = await news_to_ai_service.process_news_batch(
+    async def generate() -> List[MemeResponse]:
+        try:
+            memes = await news_to_ai_service.process_news_batch(
+                [news['title'] for news in news_list]
+            )
+            if not memes:
+                raise HTTPException(status_code=404, detail="No memes generated")
+            return memes
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    async with admitted(request):
+        return await run_until_disconnect(request, generate())
+
+@router.get('/memes/batch', response_model=MemeBatchResponse)
+async def generate_memes_batch(
+    request: Request,
+    news_service: NewsService = Depends(get_news_service),
+    news_to_ai_service: NewsToAIService = Depends(get_news_to_ai_service)
+):
+    """Generate memes from latest news with a per-item status, error and timings"""
+    news_list = await news_service.fetch_news()
+    if not news_list:
+        raise HTTPException(status_code=404, detail="No news available for meme generation")
+
+    async with admitted(request):
+        items = await run_until_disconnect(request, news_to_ai_service.process_news_batch_detailed(
             [news['title'] for news in news_list]
-        )
-        if not memes:
-            raise HTTPException(status_code=404, detail="No memes generated")
-        return memes
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        ))
+    succeeded = sum(1 for item in items if item.status == "ok")
+    degraded = sum(1 for item in items if item.status == "degraded")
+    failed = len(items) - succeeded - degraded
+    return MemeBatchResponse(
+        items=items,
+        total=len(items),
+        succeeded=succeeded,
+        degraded=degraded,
+        failed=failed,
+        partial=succeeded < len(items)
+    )
+
+@router.get('/memes/stream')
+async def stream_memes(
+    request: Request,
+    format: str = "ndjson",
+    news_service: NewsService = Depends(get_news_service),
+    news_to_ai_service: NewsToAIService = Depends(get_news_to_ai_service)
+):
+    """Stream memes from latest news as each one is ready (NDJSON or SSE)"""
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+
+    news_list = await news_service.fetch_news()
+    if not news_list:
+        raise HTTPException(status_code=404, detail="No news available for meme generation")
+
+    # Held until the stream ends; a disconnect cancels the stream and its work
+    slot = await acquire_slot(request)
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for index, result in news_to_ai_service.iter_news_batch(
+                [news['title'] for news in news_list]
+            ):
+                if result.status == "failed":
+                    event = "error"
+                    payload = {"index": index, "news": result.news, "detail": result.error}
+                else:
+                    event = "meme"
+                    payload = {"index": index, "status": result.status, "data": result.meme.model_dump()}
+
+                if format == "sse":
+                    yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+                else:
+                    yield json.dumps({"event": event, **payload}) + "\n"
+        finally:
+            slot.release()
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    # The background task also frees the slot if the stream never started
+    return StreamingResponse(events(), media_type=media_type, background=BackgroundTask(slot.release))
 
 @router.get('/meme', response_model=MemeResponse)
-async def generate_meme(news: str):
+async def generate_meme(
+    news: str,
+    request: Request,
+    news_to_ai_service: NewsToAIService = Depends(get_news_to_ai_service)
+):
     """Generate meme from news"""
     if not news:
         raise HTTPException(status_code=400, detail="News content is required")
-    
+
+    async def generate() -> MemeResponse:
+        try:
+            meme = await news_to_ai_service.generate_meme(news)
+            if not meme:
+                raise HTTPException(status_code=404, detail="Failed to generate meme")
+            return meme
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    async with admitted(request):
+        return await run_until_disconnect(request, generate())
+
+@router.post('/jobs', response_model=MemeJob, status_code=202)
+async def create_meme_job(request: MemeJobRequest, job_manager: JobManager = Depends(get_job_manager)):
+    """Queue meme generation for a news item and return the job at once"""
+    if not request.news:
+        raise HTTPException(status_code=400, detail="News content is required")
     try:
-        meme = await news_to_ai_service.generate_meme(news)
-        if not meme:
-            raise HTTPException(status_code=404, detail="Failed to generate meme")
-        return meme
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        return await job_manager.submit(request.news)
+    except AdmissionRejected as e:
+        raise rejected(e)
+
+@router.get('/jobs/{job_id}', response_model=MemeJob)
+async def get_meme_job(job_id: str, job_manager: JobManager = Depends(get_job_manager)):
+    """Get the status of a meme generation job"""
+    job = await job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get('/jobs/{job_id}/result', response_model=MemeResponse)
+async def get_meme_job_result(job_id: str, job_manager: JobManager = Depends(get_job_manager)):
+    """Get the meme produced by a job once it has succeeded"""
+    job = await job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error or "Job failed")
+    if job.status != "succeeded":
+        return JSONResponse(status_code=202, content={"id": job.id, "status": job.status})
+    return job.result
+
+@router.get('/images/{key}.{extension}')
+async def get_image(key: str, extension: str, request: Request):
+    """Serve a stored meme image or rendition by content hash"""
+    if extension not in IMAGE_MEDIA_TYPES:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    etag = f'"{key}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=31536000, immutable"
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    data = await get_image_store().get(key, extension)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return Response(content=data, media_type=IMAGE_MEDIA_TYPES[extension], headers=headers)
+
+@router.get("/cache/stats")
+async def get_cache_stats(news_to_ai_service: NewsToAIService = Depends(get_news_to_ai_service)):
+    """Report meme result cache hit and miss counts"""
+    return news_to_ai_service.meme_cache.stats()
+
+@router.get("/parse/stats")
+async def get_parse_stats(news_to_ai_service: NewsToAIService = Depends(get_news_to_ai_service)):
+    """Report meme info parse failures, retries and fallbacks"""
+    return news_to_ai_service.parse_stats.as_dict()
+
+@router.get("/backends/stats")
+async def get_backend_stats(news_to_ai_service: NewsToAIService = Depends(get_news_to_ai_service)):
+    """Report circuit state and adaptive concurrency limit per backend"""
+    return {name: guard.stats() for name, guard in news_to_ai_service.guards.items()}
+
+@router.get("/admission/stats")
+async def get_admission_stats(admission: AdmissionController = Depends(get_admission)):
+    """Report admitted, queued and waiting clients for generation endpoints"""
+    return admission.stats()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics for stage latency, errors, in-flight work and requests"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 @router.get("/version")
 async def get_version():
-    return {"version": "1.0.0"}
\ No newline at end of file
+    return {"version": "1.0.0", "prompts": PROMPTS.versions()}
\ No newline at end of file
@@ -1,3 +1,4 @@
+from typing import Any, Dict, List
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -10,7 +11,113 @@ class Settings(BaseSettings):
     UPLOAD_API_KEY: str = ""
     UPLOAD_API_URL: str = ""
     REDIS_URL: str = ""
-    
+
+    # Shared HTTP client pool
+    HTTP_MAX_CONNECTIONS: int = 50
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_TIMEOUT: float = 30.0
+    HTTP2_ENABLED: bool = True
+
+    # Extra news feeds fetched alongside NEWS_BASE_URL, as a JSON list,
+    # e.g. [{"type": "rss", "name": "coindesk", "url": "https://...", "timeout": 5}]
+    NEWS_SOURCES: List[Dict[str, Any]] = []
+    NEWS_SOURCE_TIMEOUT: float = 20.0
+    NEWS_SOURCE_LIMIT: int = 20
+    NEWS_MAX_ITEMS: int = 6
+    # Estimated headline similarity (0-1) at which stories count as the same,
+    # unless each names an entity (asset, ticker, company) the other doesn't
+    NEWS_DUPLICATE_THRESHOLD: float = 0.5
+
+    # News feed cache (seconds; TTL of 0 disables caching)
+    NEWS_CACHE_TTL: float = 120.0
+    NEWS_CACHE_STALE_TTL: float = 600.0
+
+    # Meme result cache (Redis when REDIS_URL is set, else in-process LRU)
+    MEME_CACHE_TTL: float = 86400.0
+    MEME_CACHE_MAX_ENTRIES: int = 512
+    REDIS_RETRY_INTERVAL: float = 30.0
+
+    # Start image workers and the HTTP pool at startup, not on the first request
+    STARTUP_WARMUP: bool = True
+
+    # Background meme precomputation
+    PRECOMPUTE_ENABLED: bool = False
+    PRECOMPUTE_INTERVAL: float = 300.0
+
+    # Async meme jobs (JOB_STORE: "memory", "redis", or empty to auto-pick)
+    JOB_STORE: str = ""
+    JOB_WORKERS: int = 2
+    # Queued jobs beyond this get a 503 with Retry-After
+    JOB_MAX_QUEUE: int = 100
+    JOB_TTL: float = 3600.0
+
+    # Model inference ("async" uses the shared HTTP pool, "sync" wraps InferenceClient)
+    INFERENCE_BACKEND: str = "async"
+    INFERENCE_TEXT_TIMEOUT: float = 60.0
+    INFERENCE_IMAGE_TIMEOUT: float = 120.0
+    INFERENCE_SYNC_WORKERS: int = 8
+    # JSON grammar-constrained meme info (needs a TGI-compatible text endpoint)
+    INFERENCE_JSON_GRAMMAR: bool = False
+    MEME_INFO_MAX_RETRIES: int = 1
+
+    # Image post-processing executor ("process", "thread" or "inline")
+    IMAGE_EXECUTOR: str = "process"
+    IMAGE_EXECUTOR_WORKERS: int = 2
+
+    # Primary JPEG size budget in KB (0 keeps quality 85) and extra renditions as a
+    # JSON list, e.g. [{"name": "thumb", "format": "webp", "size": 160, "max_kb": 12}].
+    # Renditions are served from the local store: they need IMAGE_STORAGE=local
+    # and IMAGE_PUBLIC_BASE_URL, and are skipped otherwise.
+    IMAGE_MAX_KB: float = 0.0
+    IMAGE_RENDITIONS: List[Dict[str, Any]] = []
+
+    # Image storage ("upload" posts to UPLOAD_API_URL, "local" serves from IMAGE_STORE_DIR
+    # at IMAGE_PUBLIC_BASE_URL; "local" without a public URL falls back to upload)
+    IMAGE_STORAGE: str = "upload"
+    IMAGE_STORE_DIR: str = "data/images"
+    IMAGE_PUBLIC_BASE_URL: str = ""
+    IMAGE_MIRROR_UPLOAD: bool = False
+
+    # External image upload (multipart binary unless the host needs base64)
+    UPLOAD_MULTIPART: bool = True
+    UPLOAD_TIMEOUT: float = 30.0
+    UPLOAD_MAX_ATTEMPTS: int = 3
+    UPLOAD_BACKOFF_BASE: float = 0.5
+    UPLOAD_BACKOFF_MAX: float = 8.0
+
+    # Admission control for generation endpoints (429/503 with Retry-After when saturated)
+    ADMISSION_MAX_ACTIVE: int = 8
+    ADMISSION_MAX_QUEUE: int = 32
+    ADMISSION_MAX_PER_CLIENT: int = 4
+    ADMISSION_QUEUE_TIMEOUT: float = 30.0
+
+    # Per-backend circuit breaker and AIMD concurrency limit (text, image, upload)
+    BREAKER_FAILURE_THRESHOLD: int = 5
+    BREAKER_RESET_TIMEOUT: float = 30.0
+    ADAPTIVE_INITIAL_LIMIT: float = 4.0
+    ADAPTIVE_MIN_LIMIT: float = 1.0
+    ADAPTIVE_MAX_LIMIT: float = 16.0
+    ADAPTIVE_DECREASE: float = 0.5
+    ADAPTIVE_TEXT_TARGET_LATENCY: float = 20.0
+    ADAPTIVE_IMAGE_TARGET_LATENCY: float = 60.0
+    ADAPTIVE_UPLOAD_TARGET_LATENCY: float = 10.0
+
+    # Per-item fallback when the image step fails ("none", "placeholder" or "text_only")
+    MEME_FALLBACK: str = "none"
+    MEME_PLACEHOLDER_IMAGE_URL: str = ""
+
+    # Batch generation ("pipeline" overlaps stages, "concurrent" runs whole memes)
+    MEME_BATCH_MODE: str = "pipeline"
+    MEME_BATCH_CONCURRENCY: int = 3
+    MEME_BATCH_RATE_PER_SECOND: float = 1.0
+    MEME_BATCH_BURST: int = 2
+    MEME_PIPELINE_TEXT_CONCURRENCY: int = 2
+    MEME_PIPELINE_IMAGE_CONCURRENCY: int = 2
+    MEME_PIPELINE_UPLOAD_CONCURRENCY: int = 4
+    MEME_PIPELINE_QUEUE_SIZE: int = 2
+    # Headlines per batched NAME/TICKER/PHRASE call in pipeline mode (1 disables)
+    MEME_TEXT_BATCH_SIZE: int = 6
 
     model_config = SettingsConfigDict(
         env_file=".env",
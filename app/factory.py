@@ -0,0 +1,45 @@
+from contextlib import asynccontextmanager
+from typing import Dict
+from fastapi import FastAPI
+from app.api.routes import router
+from app.api.dependencies import build_services
+from app.api.middleware import setup_middleware
+from app.config.settings import settings
+from app.services.http_client import close_http_client
+from app.services.image_processing import shutdown_image_executor
+from app.services.warmup import format_timings, startup_phase, warm_up
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build services and warm up on startup, release everything on shutdown."""
+    timings: Dict[str, float] = {}
+    with startup_phase(timings, "services"):
+        services = app.state.services = build_services()
+    if settings.STARTUP_WARMUP:
+        await warm_up(timings)
+    services.start()
+    app.state.startup_timings = timings
+    print(f"Startup: {format_timings(timings)}")
+    yield
+    await services.stop()
+    await close_http_client()
+    shutdown_image_executor()
+
+def create_app() -> FastAPI:
+    """Create and configure a FastAPI application."""
+    app = FastAPI(
+        title="Feed.fun API",
+        description="API for Feed.fun - Where News Meets Memes in the World of Crypto",
+        version="1.0.0",
+        docs_url=None,  # Disable Swagger UI for production
+        redoc_url=None,  # Disable ReDoc for production
+        lifespan=lifespan
+    )
+
+    # Setup middleware
+    setup_middleware(app)
+
+    # Include routers
+    app.include_router(router, prefix="/api/v1")
+
+    return app
\ No newline at end of file
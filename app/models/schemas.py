@@ -1,6 +1,6 @@
 from datetime import datetime
 from pydantic import BaseModel
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 
 class MemeResponse(BaseModel):
     news: str
@@ -8,4 +8,35 @@ class MemeResponse(BaseModel):
     ticker: str
     name: str
     image: str
-    timestamp: str
\ No newline at end of file
+    timestamp: str
+    # Extra renditions by name (e.g. "webp", "thumb") -> URL
+    images: Dict[str, str] = {}
+
+class MemeJobRequest(BaseModel):
+    news: str
+
+class MemeJob(BaseModel):
+    id: str
+    status: str  # queued, running, succeeded or failed
+    news: str
+    result: Optional[MemeResponse] = None
+    error: Optional[str] = None
+    created_at: str
+    updated_at: str
+
+class MemeItemResult(BaseModel):
+    news: str
+    status: str  # ok, degraded (fallback used) or failed
+    meme: Optional[MemeResponse] = None
+    error: Optional[str] = None
+    fallback: Optional[str] = None  # text_fallback, placeholder_image or text_only
+    cached: bool = False
+    timings: Dict[str, float] = {}  # seconds spent per stage
+
+class MemeBatchResponse(BaseModel):
+    items: List[MemeItemResult]
+    total: int
+    succeeded: int
+    degraded: int
+    failed: int
+    partial: bool
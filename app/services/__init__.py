@@ -1,7 +1,16 @@
-from .news_to_ai_service import NewsToAIService
-from .news_service import NewsService
+# Loaded on first use so image workers importing image_processing stay light
+def __getattr__(name: str):
+    if name == "NewsToAIService":
+        from .news_to_ai_service import NewsToAIService
+
+        return NewsToAIService
+    if name == "NewsService":
+        from .news_service import NewsService
+
+        return NewsService
+    raise AttributeError(f"module 'app.services' has no attribute '{name}'")
 
 __all__ = [
-    'NewsService'
+    'NewsService',
     'NewsToAIService'
-]
\ No newline at end of file
+]
@@ -0,0 +1,162 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+from app.config.settings import settings
+from app.services.metrics import ADMISSION_ACTIVE, ADMISSION_QUEUED, ADMISSION_REJECTED
+
+
+class AdmissionRejected(Exception):
+    """Raised instead of queueing: 429 for a client over its share, 503 when saturated."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionSlot:
+    """A granted slot; ``release`` is idempotent."""
+
+    def __init__(self, controller: "AdmissionController", client: str):
+        self.controller = controller
+        self.client = client
+        self.started = time.monotonic()
+        self.released = False
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.controller._release(self.client, time.monotonic() - self.started)
+
+
+class AdmissionController:
+    """Caps concurrent generation requests with a bounded, per-client fair queue.
+
+    Up to ``max_active`` requests run at once. Others wait in per-client FIFO
+    queues served round-robin, so one busy client can't starve the rest. A
+    client with ``max_per_client`` requests running or queued gets a 429; a
+    full queue or a wait longer than ``queue_timeout`` gets a 503.
+    """
+
+    def __init__(self, max_active: Optional[int] = None, max_queue: Optional[int] = None,
+                 max_per_client: Optional[int] = None, queue_timeout: Optional[float] = None):
+        self.max_active = max(1, settings.ADMISSION_MAX_ACTIVE if max_active is None else max_active)
+        self.max_queue = settings.ADMISSION_MAX_QUEUE if max_queue is None else max_queue
+        self.max_per_client = settings.ADMISSION_MAX_PER_CLIENT if max_per_client is None else max_per_client
+        self.queue_timeout = settings.ADMISSION_QUEUE_TIMEOUT if queue_timeout is None else queue_timeout
+        self.active = 0
+        self.queued = 0
+        # Clients with waiters, in round-robin order
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._per_client: Dict[str, int] = {}
+        # Moving average of how long a slot is held, for Retry-After
+        self._hold_seconds = 5.0
+
+    # Seconds until a retry is likely to find a free slot
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self._hold_seconds * (self.queued + 1) / self.max_active))
+
+    def _reject(self, status_code: int, detail: str) -> AdmissionRejected:
+        ADMISSION_REJECTED.inc(status=str(status_code))
+        return AdmissionRejected(status_code, detail, self.retry_after())
+
+    # Wait for a slot, or raise AdmissionRejected right away when saturated
+    async def acquire(self, client: str) -> AdmissionSlot:
+        if self.max_per_client > 0 and self._per_client.get(client, 0) >= self.max_per_client:
+            raise self._reject(429, "Too many concurrent requests from this client")
+
+        if self.active < self.max_active and not self.queued:
+            self._add(client)
+            self.active += 1
+            self._report()
+            return AdmissionSlot(self, client)
+
+        if self.queued >= self.max_queue:
+            raise self._reject(503, "Server is at capacity")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(client, deque()).append(waiter)
+        self._add(client)
+        self.queued += 1
+        self._report()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout if self.queue_timeout > 0 else None)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as we gave up; hand the slot on
+                AdmissionSlot(self, client).release()
+            else:
+                self._drop_waiter(client, waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._reject(503, "Timed out waiting for capacity") from None
+            raise
+        return AdmissionSlot(self, client)
+
+    @asynccontextmanager
+    async def admit(self, client: str) -> AsyncIterator[AdmissionSlot]:
+        slot = await self.acquire(client)
+        try:
+            yield slot
+        finally:
+            slot.release()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "clients": len(self._per_client),
+            "max_active": self.max_active,
+            "max_queue": self.max_queue,
+            "retry_after": self.retry_after(),
+        }
+
+    def _add(self, client: str) -> None:
+        self._per_client[client] = self._per_client.get(client, 0) + 1
+
+    def _remove(self, client: str) -> None:
+        count = self._per_client.get(client, 0) - 1
+        if count > 0:
+            self._per_client[client] = count
+        else:
+            self._per_client.pop(client, None)
+
+    def _drop_waiter(self, client: str, waiter: asyncio.Future) -> None:
+        queue = self._queues.get(client)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self._queues[client]
+            self.queued -= 1
+            self._remove(client)
+            self._report()
+
+    def _release(self, client: str, held: float) -> None:
+        self.active -= 1
+        self._remove(client)
+        self._hold_seconds += 0.2 * (held - self._hold_seconds)
+        self._dispatch()
+        self._report()
+
+    # Grant free slots to waiting clients in round-robin order
+    def _dispatch(self) -> None:
+        while self.active < self.max_active and self._queues:
+            client, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            if queue:
+                self._queues.move_to_end(client)
+            else:
+                del self._queues[client]
+            self.queued -= 1
+            if waiter.done():
+                self._remove(client)
+                continue
+            self.active += 1
+            waiter.set_result(None)
+
+    def _report(self) -> None:
+        ADMISSION_ACTIVE.set(self.active)
+        ADMISSION_QUEUED.set(self.queued)
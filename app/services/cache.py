@@ -0,0 +1,73 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from app.services.singleflight import SingleFlight
+
+
+@dataclass
+class _Entry:
+    value: Any
+    expires_at: float
+
+
+class TTLCache:
+    """In-process async cache with stale-while-revalidate refresh.
+
+    Fresh entries are returned directly. Entries past ``ttl`` but within
+    ``stale_ttl`` are returned as-is while one background refresh runs.
+    Missing or fully expired entries are fetched once, with concurrent
+    callers sharing the same in-flight fetch.
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float = 0.0,
+                 should_cache: Callable[[Any], bool] = bool):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.should_cache = should_cache
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._flights = SingleFlight()
+
+    # Return the cached value, refreshing it when needed
+    async def get_or_fetch(self, key: Hashable, fetcher: Callable[[], Awaitable[Any]]) -> Any:
+        if self.ttl <= 0:
+            return await fetcher()
+
+        entry = self._entries.get(key)
+        now = time.monotonic()
+
+        if entry and now < entry.expires_at:
+            return entry.value
+
+        if entry and now < entry.expires_at + self.stale_ttl:
+            self._refresh(key, fetcher)
+            return entry.value
+
+        # Shield so one cancelled caller doesn't abort the shared fetch
+        return await asyncio.shield(self._refresh(key, fetcher))
+
+    # Start a fetch for key unless one is already running
+    def _refresh(self, key: Hashable, fetcher: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        return self._flights.get(key) or self._flights.start(key, lambda: self._fetch(key, fetcher))
+
+    async def _fetch(self, key: Hashable, fetcher: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await fetcher()
+        except Exception as e:
+            # Keep serving the stale entry, if any, when a refresh fails
+            entry = self._entries.get(key)
+            if entry is None:
+                raise
+            print(f"Cache refresh error for {key!r}: {str(e)}")
+            return entry.value
+
+        if self.should_cache(value):
+            self._entries[key] = _Entry(value, time.monotonic() + self.ttl)
+        return value
+
+    # Drop one key, or everything when key is None
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
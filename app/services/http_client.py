@@ -0,0 +1,39 @@
+import importlib.util
+from typing import Optional
+import httpx
+from app.config.settings import settings
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+# Build the shared client with keep-alive pool limits
+def _create_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+    )
+    # HTTP/2 needs the optional h2 package (httpx[http2])
+    http2 = settings.HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=settings.HTTP_TIMEOUT,
+        http2=http2,
+        follow_redirects=True
+    )
+
+
+# Return the process-wide client, creating it on first use
+def get_http_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _create_client()
+    return _client
+
+
+# Close the shared client and drop its pooled connections
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,164 @@
+import asyncio
+import base64
+import io
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from app.config.settings import settings
+
+_executor: Optional[Executor] = None
+
+
+# File extension and media type per Pillow format
+IMAGE_FORMATS = {
+    "JPEG": ("jpg", "image/jpeg"),
+    "WEBP": ("webp", "image/webp"),
+    "AVIF": ("avif", "image/avif"),
+    "PNG": ("png", "image/png"),
+}
+
+
+@dataclass(frozen=True)
+class RenditionSpec:
+    """One output variant. ``max_kb`` of 0 encodes at ``max_quality``;
+    otherwise the highest quality that fits the budget is searched for."""
+    name: str
+    format: str = "JPEG"
+    width: int = 500
+    height: int = 500
+    max_kb: float = 0.0
+    max_quality: int = 85
+    min_quality: int = 30
+
+    @property
+    def extension(self) -> str:
+        return IMAGE_FORMATS[self.format][0]
+
+
+def _encode(image: Any, image_format: str, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    if image_format == "JPEG":
+        image.save(buffer, format="JPEG", optimize=True, quality=quality, progressive=True)
+    elif image_format == "WEBP":
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+    elif image_format == "PNG":
+        image.save(buffer, format="PNG", optimize=True)
+    else:
+        image.save(buffer, format=image_format, quality=quality)
+    return buffer.getvalue()
+
+
+# Binary search for the highest quality within the size budget; if even
+# min_quality is over budget, the smallest encoding is returned
+def _encode_within_budget(image: Any, spec: RenditionSpec) -> bytes:
+    if spec.max_kb <= 0 or spec.format == "PNG":
+        return _encode(image, spec.format, spec.max_quality)
+
+    budget = spec.max_kb * 1024
+    low, high = spec.min_quality, spec.max_quality
+    best = None
+    while low <= high:
+        quality = (low + high) // 2
+        data = _encode(image, spec.format, quality)
+        if len(data) <= budget:
+            best = data
+            low = quality + 1
+        else:
+            high = quality - 1
+    return best if best is not None else _encode(image, spec.format, spec.min_quality)
+
+
+# Decode a generated image once and encode every rendition from it.
+# Runs inside the image executor, so it must stay a picklable module-level function.
+def render_image(data: Union[bytes, Any], specs: List[RenditionSpec]) -> Dict[str, bytes]:
+    from PIL import Image
+
+    image = data if isinstance(data, Image.Image) else Image.open(io.BytesIO(data))
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    image.load()
+
+    # Resize once per distinct size, always from the decoded source
+    resized: Dict[Tuple[int, int], Any] = {}
+    renditions = {}
+    for spec in specs:
+        size = (spec.width, spec.height)
+        if size not in resized:
+            resized[size] = image if image.size == size else image.resize(size, Image.Resampling.LANCZOS)
+        renditions[spec.name] = _encode_within_budget(resized[size], spec)
+    return renditions
+
+
+# Rendition specs from settings, skipping formats this Pillow build can't write
+def load_rendition_specs(entries: List[Dict[str, Any]]) -> List[RenditionSpec]:
+    if not entries:
+        return []
+    from PIL import Image
+
+    Image.init()
+    specs = []
+    for entry in entries:
+        options = dict(entry)
+        options["format"] = str(options.get("format", "JPEG")).upper()
+        size = options.pop("size", None)
+        if size:
+            options.setdefault("width", size)
+            options.setdefault("height", size)
+        spec = RenditionSpec(**options)
+        if spec.format not in IMAGE_FORMATS or spec.format not in Image.SAVE:
+            print(f"Image rendition '{spec.name}' skipped: {spec.format} encoding not available")
+            continue
+        specs.append(spec)
+    return specs
+
+
+# Decode, resize, convert and encode a generated image as an optimized JPEG.
+# Runs inside the image executor, so it must stay a picklable module-level function.
+def process_image(data: Union[bytes, Any], size: Tuple[int, int] = (500, 500), quality: int = 85) -> bytes:
+    spec = RenditionSpec("image", "JPEG", size[0], size[1], max_quality=quality)
+    return render_image(data, [spec])["image"]
+
+
+def encode_base64(data: bytes) -> str:
+    return base64.b64encode(data).decode('utf-8')
+
+
+# Build the executor for CPU-bound image work
+def _create_executor() -> Executor:
+    workers = max(1, settings.IMAGE_EXECUTOR_WORKERS)
+    if settings.IMAGE_EXECUTOR == "thread":
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image")
+    # Spawn keeps workers clean of the parent's threads and open sockets
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def get_image_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        _executor = _create_executor()
+    return _executor
+
+
+def shutdown_image_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+# Load Pillow and its format plugins; run in each executor worker at startup
+def warm_image_worker() -> int:
+    from PIL import Image
+
+    Image.init()
+    return len(Image.SAVE)
+
+
+# Run fn off the event loop in the image executor ("inline" runs it in place)
+async def run_image_task(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    if settings.IMAGE_EXECUTOR == "inline":
+        return fn(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_image_executor(), partial(fn, *args, **kwargs))
@@ -0,0 +1,76 @@
+import asyncio
+import hashlib
+import os
+import re
+from typing import Optional
+from app.config.settings import settings
+
+_KEY = re.compile(r"^[0-9a-f]{64}$")
+
+
+class ImageStore:
+    """Content-addressed image storage; keys are SHA-256 hex digests."""
+
+    async def put(self, data: bytes, extension: str = "jpg") -> str:
+        raise NotImplementedError
+
+    async def get(self, key: str, extension: str = "jpg") -> Optional[bytes]:
+        raise NotImplementedError
+
+    @staticmethod
+    def key_for(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def is_valid_key(key: str) -> bool:
+        return bool(_KEY.match(key))
+
+    # Public URL for a stored image, served by GET /api/v1/images/{key}.{extension}
+    def url(self, key: str, extension: str = "jpg") -> str:
+        return f"{settings.IMAGE_PUBLIC_BASE_URL.rstrip('/')}/api/v1/images/{key}.{extension}"
+
+
+class LocalImageStore(ImageStore):
+    """Images on the local filesystem, sharded by the first two hex digits."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str, extension: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.{extension}")
+
+    def _write(self, path: str, data: bytes) -> None:
+        if os.path.exists(path):
+            return  # Identical content is already stored
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _read(self, path: str) -> Optional[bytes]:
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    async def put(self, data: bytes, extension: str = "jpg") -> str:
+        key = self.key_for(data)
+        await asyncio.to_thread(self._write, self._path(key, extension), data)
+        return key
+
+    async def get(self, key: str, extension: str = "jpg") -> Optional[bytes]:
+        if not self.is_valid_key(key) or not extension.isalnum():
+            return None
+        return await asyncio.to_thread(self._read, self._path(key, extension))
+
+
+_store: Optional[ImageStore] = None
+
+
+def get_image_store() -> ImageStore:
+    global _store
+    if _store is None:
+        _store = LocalImageStore(settings.IMAGE_STORE_DIR)
+    return _store
@@ -0,0 +1,122 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Optional
+from app.config.settings import settings
+from app.services.http_client import get_http_client
+
+if TYPE_CHECKING:
+    from huggingface_hub import InferenceClient
+
+DEFAULT_INFERENCE_URL = "https://api-inference.huggingface.co/models"
+
+
+class InferenceBackend:
+    """Async interface to the text and image models.
+
+    ``timeout`` bounds each call; cancelling the awaiting task abandons it.
+    ``supports_grammar`` backends accept a ``grammar`` parameter for
+    constrained generation.
+    """
+
+    supports_grammar = False
+
+    async def text_generation(self, prompt: str, timeout: Optional[float] = None, **parameters: Any) -> str:
+        raise NotImplementedError
+
+    async def text_to_image(self, prompt: str, timeout: Optional[float] = None, **parameters: Any) -> Any:
+        raise NotImplementedError
+
+
+class AsyncInferenceBackend(InferenceBackend):
+    """Calls the Inference API over the shared pooled httpx client."""
+
+    supports_grammar = True
+
+    def __init__(self, text_model: str, image_model: str, token: str, base_url: Optional[str] = None):
+        self.base_url = (base_url or DEFAULT_INFERENCE_URL).rstrip("/")
+        self.text_url = self._model_url(text_model)
+        self.image_url = self._model_url(image_model)
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+
+    # Models may be given as repo IDs or as full endpoint URLs
+    def _model_url(self, model: str) -> str:
+        if model.startswith(("http://", "https://")):
+            return model
+        return f"{self.base_url}/{model}"
+
+    async def _post(self, url: str, payload: dict, timeout: Optional[float]):
+        response = await get_http_client().post(
+            url,
+            json=payload,
+            headers=self.headers,
+            timeout=timeout
+        )
+        response.raise_for_status()
+        return response
+
+    async def text_generation(self, prompt: str, timeout: Optional[float] = None, **parameters: Any) -> str:
+        parameters.setdefault("return_full_text", False)
+        response = await self._post(
+            self.text_url,
+            {"inputs": prompt, "parameters": parameters},
+            timeout
+        )
+        data = response.json()
+        if isinstance(data, list):
+            data = data[0]
+        return data["generated_text"]
+
+    async def text_to_image(self, prompt: str, timeout: Optional[float] = None, **parameters: Any) -> bytes:
+        response = await self._post(
+            self.image_url,
+            {"inputs": prompt, "parameters": parameters},
+            timeout
+        )
+        return response.content
+
+
+class SyncInferenceBackend(InferenceBackend):
+    """Fallback around blocking ``InferenceClient`` calls.
+
+    Calls run on a dedicated thread pool rather than the loop's default one.
+    A timed-out call stops being awaited but its thread runs to completion.
+    """
+
+    def __init__(self, text_client: "InferenceClient", image_client: "InferenceClient",
+                 workers: Optional[int] = None):
+        self.text_client = text_client
+        self.image_client = image_client
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.INFERENCE_SYNC_WORKERS if workers is None else workers),
+            thread_name_prefix="inference"
+        )
+
+    async def _call(self, fn: Callable[..., Any], timeout: Optional[float], *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+        return await asyncio.wait_for(future, timeout)
+
+    async def text_generation(self, prompt: str, timeout: Optional[float] = None, **parameters: Any) -> str:
+        return await self._call(self.text_client.text_generation, timeout, prompt, **parameters)
+
+    async def text_to_image(self, prompt: str, timeout: Optional[float] = None, **parameters: Any) -> Any:
+        return await self._call(self.image_client.text_to_image, timeout, prompt, **parameters)
+
+
+# Pick the configured backend ("async" or "sync")
+def create_inference_backend() -> InferenceBackend:
+    if settings.INFERENCE_BACKEND == "sync":
+        # huggingface_hub (and requests) are only loaded for the sync fallback
+        from huggingface_hub import InferenceClient
+
+        return SyncInferenceBackend(
+            InferenceClient(model=settings.AI_PROMPT_MODEL, token=settings.AI_API_KEY),
+            InferenceClient(model=settings.AI_IMAGE_MODEL, token=settings.AI_API_KEY)
+        )
+    return AsyncInferenceBackend(
+        text_model=settings.AI_PROMPT_MODEL,
+        image_model=settings.AI_IMAGE_MODEL,
+        token=settings.AI_API_KEY,
+        base_url=settings.AI_BASE_URL
+    )
@@ -0,0 +1,177 @@
+import asyncio
+import math
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from app.config.settings import settings
+from app.models.schemas import MemeJob
+from app.services.admission import AdmissionRejected
+from app.services.news_to_ai_service import NewsToAIService
+
+
+def _now() -> str:
+    return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class JobStore:
+    """Where job state lives; shared by every process using the same backend."""
+
+    async def save(self, job: MemeJob) -> None:
+        raise NotImplementedError
+
+    async def get(self, job_id: str) -> Optional[MemeJob]:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryJobStore(JobStore):
+    """Per-process job store; entries expire after ``ttl`` seconds."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._jobs: Dict[str, Tuple[float, MemeJob]] = {}
+
+    async def save(self, job: MemeJob) -> None:
+        now = time.monotonic()
+        self._jobs = {
+            job_id: entry for job_id, entry in self._jobs.items()
+            if entry[0] > now
+        }
+        self._jobs[job.id] = (now + self.ttl, job)
+
+    async def get(self, job_id: str) -> Optional[MemeJob]:
+        entry = self._jobs.get(job_id)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+
+class RedisJobStore(JobStore):
+    """Job store in Redis, so any uvicorn worker can answer status polls."""
+
+    def __init__(self, redis_url: str, ttl: float):
+        import redis.asyncio as redis
+
+        self.ttl = ttl
+        self._redis = redis.from_url(redis_url)
+
+    async def save(self, job: MemeJob) -> None:
+        await self._redis.set(f"job:{job.id}", job.model_dump_json(), ex=int(self.ttl))
+
+    async def get(self, job_id: str) -> Optional[MemeJob]:
+        payload = await self._redis.get(f"job:{job_id}")
+        if payload is None:
+            return None
+        return MemeJob.model_validate_json(payload)
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+# Pick the configured store: Redis when available, memory otherwise
+def create_job_store() -> JobStore:
+    backend = settings.JOB_STORE or ("redis" if settings.REDIS_URL else "memory")
+    if backend == "redis":
+        return RedisJobStore(settings.REDIS_URL, settings.JOB_TTL)
+    return InMemoryJobStore(settings.JOB_TTL)
+
+
+class JobManager:
+    """Queue of meme generation jobs run by a pool of async workers.
+
+    At most ``max_queue`` jobs wait at once; ``submit`` raises AdmissionRejected
+    (503) when the queue is full instead of growing it without bound.
+    """
+
+    def __init__(self, news_to_ai_service: NewsToAIService, store: Optional[JobStore] = None,
+                 workers: Optional[int] = None, max_queue: Optional[int] = None):
+        self.news_to_ai_service = news_to_ai_service
+        self.store = store or create_job_store()
+        self.workers = settings.JOB_WORKERS if workers is None else workers
+        self.max_queue = settings.JOB_MAX_QUEUE if max_queue is None else max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+        # Moving average of how long a job runs, for Retry-After
+        self._job_seconds = 10.0
+
+    # Start the workers if they aren't running yet
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._stopping = False
+        self._queue = asyncio.Queue(maxsize=max(1, self.max_queue))
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(max(1, self.workers))]
+
+    async def stop(self) -> None:
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.store.close()
+
+    # Seconds until a worker is likely to have taken a job off the full queue
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self._job_seconds / max(1, self.workers)))
+
+    def _queue_full(self) -> AdmissionRejected:
+        return AdmissionRejected(503, "Job queue is full", self.retry_after())
+
+    # Record a new job and queue it for the workers
+    async def submit(self, news: str) -> MemeJob:
+        self.start()
+        if self._queue.full():
+            raise self._queue_full()
+        now = _now()
+        job = MemeJob(id=uuid.uuid4().hex, status="queued", news=news,
+                      created_at=now, updated_at=now)
+        await self.store.save(job)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            # Filled up while the job was being saved
+            await self._update(job, status="failed", error="Job queue is full")
+            raise self._queue_full()
+        return job
+
+    async def get(self, job_id: str) -> Optional[MemeJob]:
+        return await self.store.get(job_id)
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            started = time.monotonic()
+            try:
+                await self._run(job)
+            finally:
+                self._job_seconds += 0.2 * (time.monotonic() - started - self._job_seconds)
+                self._queue.task_done()
+
+    async def _run(self, job: MemeJob) -> None:
+        job = await self._update(job, status="running")
+        try:
+            meme = await self.news_to_ai_service.generate_meme(job.news)
+        except asyncio.CancelledError:
+            if self._stopping:
+                raise
+            # The shared generation was cancelled by others; keep this worker alive
+            print(f"Job {job.id} failed: generation was cancelled")
+            await self._update(job, status="failed", error="Generation was cancelled")
+            return
+        except Exception as e:
+            print(f"Job {job.id} failed: {str(e)}")
+            await self._update(job, status="failed", error=str(e))
+            return
+        await self._update(job, status="succeeded", result=meme)
+
+    async def _update(self, job: MemeJob, **fields) -> MemeJob:
+        job = job.model_copy(update={**fields, "updated_at": _now()})
+        try:
+            await self.store.save(job)
+        except Exception as e:
+            print(f"Job store error for {job.id}: {str(e)}")
+        return job
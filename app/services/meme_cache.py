@@ -0,0 +1,130 @@
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from app.config.settings import settings
+from app.models.schemas import MemeResponse
+from app.services.prompts import PROMPTS
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+# Normalize headline text so trivial variations share one cache entry
+def normalize_news(news: str) -> str:
+    return _WHITESPACE.sub(" ", news).strip().lower()
+
+
+class MemeCache:
+    """Content-addressed cache of generated memes.
+
+    Entries live in Redis when ``settings.REDIS_URL`` is set and reachable,
+    otherwise in a bounded in-process LRU. Both honour the same TTL.
+    """
+
+    def __init__(self, redis_url: Optional[str] = None, ttl: Optional[float] = None,
+                 max_entries: Optional[int] = None):
+        self.redis_url = settings.REDIS_URL if redis_url is None else redis_url
+        self.ttl = settings.MEME_CACHE_TTL if ttl is None else ttl
+        self.max_entries = settings.MEME_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self._redis = None
+        if self.redis_url:
+            import redis.asyncio as redis
+
+            self._redis = redis.from_url(self.redis_url)
+        self._redis_retry_at = 0.0
+        self._local: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # Build the cache key from the news text and the models, prompt versions
+    # and image renditions that produce it
+    def key(self, news: str) -> str:
+        material = "|".join([
+            normalize_news(news),
+            settings.AI_PROMPT_MODEL,
+            settings.AI_IMAGE_MODEL,
+            PROMPTS.version_key(),
+            ",".join(sorted(str(entry.get("name", "")) for entry in settings.IMAGE_RENDITIONS)),
+        ])
+        return "meme:" + hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    # Redis is skipped for a while after an error, then retried
+    def _redis_available(self) -> bool:
+        return self._redis is not None and time.monotonic() >= self._redis_retry_at
+
+    def _redis_failed(self, e: Exception) -> None:
+        print(f"Meme cache Redis error, using local cache: {str(e)}")
+        self._redis_retry_at = time.monotonic() + settings.REDIS_RETRY_INTERVAL
+
+    # Look up a cached meme
+    async def get(self, news: str) -> Optional[MemeResponse]:
+        if self.ttl <= 0:
+            return None
+
+        key = self.key(news)
+        payload = None
+
+        if self._redis_available():
+            try:
+                payload = await self._redis.get(key)
+            except Exception as e:
+                self._redis_failed(e)
+                payload = self._get_local(key)
+        else:
+            payload = self._get_local(key)
+
+        if payload is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return MemeResponse.model_validate_json(payload)
+
+    # Store a generated meme
+    async def set(self, news: str, meme: MemeResponse) -> None:
+        if self.ttl <= 0:
+            return
+
+        key = self.key(news)
+        payload = meme.model_dump_json()
+
+        if self._redis_available():
+            try:
+                await self._redis.set(key, payload, ex=int(self.ttl))
+                return
+            except Exception as e:
+                self._redis_failed(e)
+        self._set_local(key, payload)
+
+    def _get_local(self, key: str) -> Optional[str]:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        if time.monotonic() >= expires_at:
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return payload
+
+    def _set_local(self, key: str, payload: str) -> None:
+        self._local[key] = (time.monotonic() + self.ttl, payload)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    # Hit/miss counters for monitoring
+    def stats(self) -> Dict[str, object]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "redis" if self._redis_available() else "local",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "local_entries": len(self._local),
+        }
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.aclose()
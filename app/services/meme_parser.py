@@ -0,0 +1,151 @@
+import json
+import re
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+FIELDS = ("name", "ticker", "phrase")
+
+# JSON schema for grammar-constrained generation
+MEME_INFO_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string", "minLength": 3, "maxLength": 32},
+        "ticker": {"type": "string", "pattern": "^[A-Z0-9]{3,6}$"},
+        "phrase": {"type": "string", "minLength": 3, "maxLength": 120},
+    },
+    "required": list(FIELDS),
+}
+
+# "NAME: x", "**Name** - x", "1. Ticker = x", "- PHRASE: x"
+_FIELD_LINE = re.compile(
+    r"^[\s\-*#>\d.)]*\**\s*(name|ticker|phrase)\s*\**\s*[:=\-–]\s*(.+)$",
+    re.IGNORECASE
+)
+_WRAPPING = " \t\"'`*[]"
+# Item markers in a batched response: "[2]", "**[2]**", "[2] NAME: x", "2.", "**2)** x"
+_BRACKET_MARKER = re.compile(r"^[\s#>*_\-]*\[(\d+)\][\s*_:.)\-]*(.*)$")
+_NUMBER_MARKER = re.compile(r"^[\s#>*_\-]*(\d+)[.):][\s*_]*(.*)$")
+# "2. Ticker: x" numbers a field within an item, not the next item
+_NUMBERED_FIELD = re.compile(r"^\W*(ticker|phrase)\b", re.IGNORECASE)
+
+
+class MemeInfoError(ValueError):
+    """Raised when a model response doesn't yield usable meme info."""
+
+
+@dataclass
+class ParseStats:
+    """Counters for measuring inference spent on unusable generations."""
+    attempts: int = 0
+    parse_failures: int = 0
+    retries: int = 0
+    fallbacks: int = 0
+    call_failures: int = 0
+    wasted_seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _clean(value: str) -> str:
+    return value.strip().strip(_WRAPPING).strip()
+
+
+# Parse the first JSON object in text, if any
+def _extract_json(text: str) -> Optional[dict]:
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+# Pull name/ticker/phrase out of a JSON or line-formatted response.
+# Fields that can't be found are None.
+def parse_meme_info(text: str) -> Dict[str, Optional[str]]:
+    info: Dict[str, Optional[str]] = dict.fromkeys(FIELDS)
+
+    data = _extract_json(text)
+    if data:
+        lowered = {str(key).lower(): value for key, value in data.items()}
+        for field in FIELDS:
+            if isinstance(lowered.get(field), str) and _clean(lowered[field]):
+                info[field] = _clean(lowered[field])
+
+    for line in text.splitlines():
+        match = _FIELD_LINE.match(line.strip())
+        if match:
+            field = match.group(1).lower()
+            if info[field] is None and _clean(match.group(2)):
+                info[field] = _clean(match.group(2))
+
+    if info["ticker"]:
+        info["ticker"] = re.sub(r"[^A-Za-z0-9]", "", info["ticker"]).upper() or None
+    return info
+
+
+# Split a batched response into its numbered items' text. "[n]" always starts
+# item n; a bare "n." only starts the next item in sequence, so numbered fields
+# inside an item aren't taken for items. Text after a marker belongs to its item.
+def split_batch_items(text: str) -> Dict[int, str]:
+    blocks: Dict[int, List[str]] = {}
+    current = None
+    for line in text.splitlines():
+        marker = _BRACKET_MARKER.match(line)
+        if not marker:
+            marker = _NUMBER_MARKER.match(line)
+            if marker and (int(marker.group(1)) != (current or 0) + 1
+                           or _NUMBERED_FIELD.match(marker.group(2))):
+                marker = None
+        if marker:
+            current = int(marker.group(1))
+            blocks[current] = [marker.group(2)]
+        elif current is not None:
+            blocks[current].append(line)
+    return {index: "\n".join(lines) for index, lines in blocks.items()}
+
+
+# Check parsed meme info, raising MemeInfoError when it is unusable
+def validate_meme_info(info: Dict[str, Optional[str]]) -> Dict[str, str]:
+    name, ticker, phrase = info.get("name"), info.get("ticker"), info.get("phrase")
+
+    missing = [field for field in FIELDS if not info.get(field)]
+    if missing:
+        raise MemeInfoError(f"Incomplete response from AI, missing {', '.join(missing)}")
+    if not (3 <= len(name) <= 32):
+        raise MemeInfoError(f"Name length invalid: {len(name)} chars")
+    if not (3 <= len(ticker) <= 6):
+        raise MemeInfoError(f"Ticker length invalid: {len(ticker)} chars")
+
+    # Add default emoji if none present
+    if '🚀' not in phrase and '📈' not in phrase:
+        phrase = f"{phrase} 🚀"
+
+    return {
+        "name": name,
+        "ticker": ticker.upper(),
+        "phrase": phrase
+    }
+
+
+class FallbackMemeInfo(dict):
+    """Meme info patched with stock values; usable, but not a real result."""
+
+
+# Fill whatever is missing or invalid with the stock fallback values
+def fallback_meme_info(info: Dict[str, Optional[str]]) -> Dict[str, str]:
+    name, ticker, phrase = info.get("name"), info.get("ticker"), info.get("phrase")
+    if not name or not (3 <= len(name) <= 32):
+        name = "CryptoMeme"
+    if not ticker or not (3 <= len(ticker) <= 6):
+        ticker = "MEME"
+    if not phrase:
+        phrase = "to the moon! 🚀"
+    return FallbackMemeInfo(
+        name=name,
+        ticker=ticker,
+        phrase=phrase
+    )
@@ -0,0 +1,122 @@
+import random
+import re
+import zlib
+from typing import Dict, List, Set, Tuple
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_ENTITY_TOKEN = re.compile(r"[A-Za-z][A-Za-z0-9]*")
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+# Character shingles of a headline with case, punctuation and spacing removed
+def shingles(text: str, size: int = 4) -> Set[str]:
+    normalized = " ".join(_NON_WORD.sub(" ", text.lower()).split())
+    if len(normalized) <= size:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+
+# Assets, exchanges and firms often written in lowercase or title case
+KNOWN_ENTITIES = frozenset({
+    "bitcoin", "btc", "ethereum", "ether", "eth", "solana", "xrp", "ripple", "cardano", "ada",
+    "dogecoin", "doge", "shiba", "shib", "bnb", "tether", "usdt", "usdc", "polygon", "matic",
+    "avalanche", "avax", "polkadot", "chainlink", "litecoin", "ltc", "tron", "trx", "toncoin",
+    "arbitrum", "uniswap", "binance", "coinbase", "kraken", "okx", "bybit", "blackrock",
+    "grayscale", "fidelity", "microstrategy",
+})
+
+
+# Entity-like tokens: known assets, all-caps tickers and acronyms (SEC, XRP) and,
+# in sentence-case headlines, capitalized names after the first word. In title
+# case capitals say nothing, so only known assets and all-caps tokens count.
+def entities(text: str) -> Set[str]:
+    words = _ENTITY_TOKEN.findall(text)
+    if not words:
+        return set()
+    upper = sum(word.isupper() for word in words)
+    capitalized = sum(word[0].isupper() for word in words)
+    shouting = upper * 2 > len(words)
+    title_case = capitalized * 2 > len(words)
+
+    found = set()
+    for position, word in enumerate(words):
+        lowered = word.lower()
+        if (lowered in KNOWN_ENTITIES
+                or (not shouting and len(word) >= 2 and word.isupper())
+                or (not title_case and position and word[0].isupper())):
+            found.add(lowered)
+    return found
+
+
+# Same template, different subject: each headline names an entity the other
+# doesn't, e.g. "Solana ETF approved" vs "XRP ETF approved"
+def swaps_entity(a: Set[str], b: Set[str]) -> bool:
+    return bool(a - b) and bool(b - a)
+
+
+class NearDuplicateIndex:
+    """MinHash signatures over headline shingles, bucketed with LSH bands.
+
+    ``add`` returns False when a headline's estimated Jaccard similarity with
+    one already indexed reaches ``threshold``, unless each names an entity the
+    other doesn't (crypto headlines share templates, so "Solana ETF approved by
+    SEC" and "Ethereum ETF approved by SEC" are different stories, while
+    "hits" vs "reaches" is the same story reworded). Only headlines
+    sharing an LSH band are compared, so each check is about constant time
+    instead of a scan over everything seen so far.
+    """
+
+    def __init__(self, threshold: float = 0.5, num_perm: int = 64, bands: int = 32, shingle_size: int = 4):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        # Fixed coefficients so signatures are stable across processes
+        rng = random.Random(num_perm)
+        self._perms = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+                       for _ in range(num_perm)]
+        self._buckets: List[Dict[Tuple[int, ...], List[int]]] = [{} for _ in range(bands)]
+        self._signatures: List[Tuple[int, ...]] = []
+        self._entities: List[Set[str]] = []
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in shingles(text, self.shingle_size)]
+        if not hashes:
+            return tuple(_MAX_HASH for _ in self._perms)
+        return tuple(
+            min((a * h + b) % _MERSENNE_PRIME for h in hashes) & _MAX_HASH
+            for a, b in self._perms
+        )
+
+    @staticmethod
+    def similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+        return sum(x == y for x, y in zip(a, b)) / len(a)
+
+    def _bands(self, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    # Index the headline unless it's a near duplicate of one already seen
+    def add(self, text: str) -> bool:
+        signature = self.signature(text)
+        names = entities(text)
+        candidates: Set[int] = set()
+        for band, key in self._bands(signature):
+            candidates.update(self._buckets[band].get(key, ()))
+        for candidate in candidates:
+            if (self.similarity(signature, self._signatures[candidate]) >= self.threshold
+                    and not swaps_entity(names, self._entities[candidate])):
+                return False
+
+        position = len(self._signatures)
+        self._signatures.append(signature)
+        self._entities.append(names)
+        for band, key in self._bands(signature):
+            self._buckets[band].setdefault(key, []).append(position)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._signatures)
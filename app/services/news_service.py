@@ -1,64 +1,60 @@
+import asyncio
 from typing import List, Dict
-import httpx
 from app.config.settings import settings
+from app.services.cache import TTLCache
+from app.services.metrics import span
+from app.services.near_duplicates import NearDuplicateIndex
+from app.services.news_sources import NewsSource, build_news_sources
 
 class NewsService:
     def __init__(self):
-        self.base_url = settings.NEWS_BASE_URL
-        self.api_key = settings.NEWS_API_KEY
+        self.sources = build_news_sources()
+        self.cache = TTLCache(
+            ttl=settings.NEWS_CACHE_TTL,
+            stale_ttl=settings.NEWS_CACHE_STALE_TTL
+        )
 
-    # API prepare params
-    def _get_params(self) -> dict:
-        return {
-            "auth_token": self.api_key,
-            "public": "true",
-            # "filter": "hot",
-            # "currencies": "BTC,ETH,USDT,BNB,SOL"
-            "region": "en"
-        }
-    
     # Check if news is valid
-    def _is_valid_news(self, title: str, existing_titles: List[str]) -> bool:
+    def _is_valid_news(self, title: str, seen: NearDuplicateIndex) -> bool:
         if not title or len(title) < 15:
             return False
-            
-        if title.lower() in [t.lower() for t in existing_titles]:
-            return False
-            
+
         spam_words = ['sponsored', 'partner', 'press release', 'promoted']
         if any(spam in title.lower() for spam in spam_words):
             return False
-            
-        return True
-    
-    # Fetch news from API
+
+        # Same story reworded by another outlet
+        return seen.add(title)
+
+    # Fetch news, served from cache while fresh
     async def fetch_news(self) -> List[Dict[str, str]]:
-        try:
-            async with httpx.AsyncClient(timeout=20.0, follow_redirects=True) as client:
-                response = await client.get(
-                    self.base_url,
-                    params=self._get_params()
-                )
-                response.raise_for_status()
-                data = response.json()
+        return await self.cache.get_or_fetch("news", self._fetch_news_uncached)
 
-                news_list = []
-                seen_titles = []
+    # Fetch one source within its timeout; a failing source contributes nothing
+    async def _fetch_source(self, source: NewsSource) -> List[Dict[str, str]]:
+        try:
+            return await asyncio.wait_for(source.fetch(), source.timeout)
+        except Exception as e:
+            print(f"News fetch error from {source.name}: {str(e) or type(e).__name__}")
+            return []
 
-                for item in data['results'][:10]:  # First 10 items
-                    title = item.get('title', '').strip()
-                    
-                    if self._is_valid_news(title, seen_titles):
-                        news_list.append({
-                            "title": title,
-                            "source": item.get('source', {}).get('title', 'unknown')
-                        })
-                        seen_titles.append(title)
+    # Fetch all sources concurrently and keep distinct stories
+    async def _fetch_news_uncached(self) -> List[Dict[str, str]]:
+        with span("news_fetch"):
+            feeds = await asyncio.gather(*(self._fetch_source(source) for source in self.sources))
 
-                        if len(news_list) >= 6:  # 6 news items
-                            break
+        news_list = []
+        seen = NearDuplicateIndex(threshold=settings.NEWS_DUPLICATE_THRESHOLD)
 
-                return news_list if news_list else self._get_backup_news()
+        # Round-robin across sources so no single feed crowds out the rest
+        for position in range(max((len(feed) for feed in feeds), default=0)):
+            for feed in feeds:
+                if position >= len(feed):
+                    continue
+                item = feed[position]
+                if self._is_valid_news(item["title"], seen):
+                    news_list.append(item)
+                    if len(news_list) >= settings.NEWS_MAX_ITEMS:
+                        return news_list
 
-        except Exception as e:
-            print(f"News fetch error: {str(e)}")
\ No newline at end of file
+        return news_list
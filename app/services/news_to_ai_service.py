@@ -1,196 +1,220 @@
 import asyncio
+import io
+import random
+import time
 from datetime import datetime
-import base64
-from typing import Dict, Optional
-import aiohttp
-from huggingface_hub import InferenceClient
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+import httpx
 from app.config.settings import settings
-from app.models.schemas import MemeResponse
+from app.models.schemas import MemeItemResult, MemeResponse
+from app.services.rate_limit import TokenBucket
+from app.services.pipeline import Stage, run_pipeline
+from app.services.http_client import get_http_client
+from app.services.meme_cache import MemeCache, normalize_news
+from app.services.singleflight import SingleFlight
+from app.services.inference import create_inference_backend
+from app.services.image_store import get_image_store
+from app.services.metrics import span
+from app.services.resilience import create_backend_guards
+from app.services.prompts import MEME_INFO_FORMAT_JSON, MEME_INFO_FORMAT_LINES, PROMPTS
+from app.services.meme_parser import (
+    MEME_INFO_SCHEMA, FallbackMemeInfo, MemeInfoError, ParseStats,
+    fallback_meme_info, parse_meme_info, split_batch_items, validate_meme_info
+)
+from app.services.image_processing import (
+    RenditionSpec, encode_base64, load_rendition_specs, render_image, run_image_task
+)
+
+RETRYABLE_UPLOAD_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+# Exponential backoff with full jitter for upload retry number `attempt` (1-based)
+def upload_backoff(attempt: int) -> float:
+    ceiling = min(settings.UPLOAD_BACKOFF_MAX, settings.UPLOAD_BACKOFF_BASE * 2 ** (attempt - 1))
+    return random.uniform(0, ceiling)
+
+@dataclass
+class MemeWork:
+    """One item's progress through the text, image and upload steps."""
+    news: str
+    meme_info: Optional[Dict[str, str]] = None
+    image_bytes: Optional[bytes] = None
+    image_url: Optional[str] = None
+    renditions: Dict[str, bytes] = field(default_factory=dict)
+    image_urls: Dict[str, str] = field(default_factory=dict)
+    error: Optional[str] = None
+    fallback: Optional[str] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+class MemeStepError(Exception):
+    """A step failed; keeps the item's work so far for reporting."""
+
+    def __init__(self, work: MemeWork, message: str):
+        super().__init__(message)
+        self.work = work
+
 
 class NewsToAIService:
     def __init__(self):
-        # Initialize API clients
-        self.text_client = InferenceClient(
-            model=settings.AI_PROMPT_MODEL,
-            token=settings.AI_API_KEY
-        )
-        self.image_client = InferenceClient(
-            model=settings.AI_IMAGE_MODEL,
-            token=settings.AI_API_KEY
-        )
+        # Async backend by default; INFERENCE_BACKEND=sync wraps InferenceClient
+        self.inference = create_inference_backend()
+        # Circuit breaker and adaptive concurrency limit per backend
+        self.guards = create_backend_guards()
+        self.image_storage = self._image_storage()
+        # Primary JPEG ("image") plus any configured renditions, all from one decode
+        self.image_specs = [
+            RenditionSpec("image", "JPEG", 500, 500, max_kb=settings.IMAGE_MAX_KB)
+        ] + self._rendition_specs()
         self.upload_api_url = settings.UPLOAD_API_URL
         self.upload_api_key = settings.UPLOAD_API_KEY
+        self.meme_cache = MemeCache()
+        self.parse_stats = ParseStats()
+        # In-flight generations keyed on normalized news, shared by all callers
+        self.inflight = SingleFlight()
+        self._batch_tasks = set()
+        self.batch_mode = settings.MEME_BATCH_MODE
+        self.batch_concurrency = settings.MEME_BATCH_CONCURRENCY
+        self.text_batch_size = settings.MEME_TEXT_BATCH_SIZE
+        # Shared across batches so concurrent /memes calls respect one rate
+        self.rate_limiter = TokenBucket(
+            rate=settings.MEME_BATCH_RATE_PER_SECOND,
+            capacity=settings.MEME_BATCH_BURST
+        )
+
+    # The local store is only reachable through IMAGE_PUBLIC_BASE_URL (this service
+    # is internal-only), so without one images go to the upload host instead
+    def _image_storage(self) -> str:
+        if settings.IMAGE_STORAGE == "local" and not settings.IMAGE_PUBLIC_BASE_URL:
+            print("IMAGE_STORAGE=local needs IMAGE_PUBLIC_BASE_URL, uploading images instead")
+            return "upload"
+        return settings.IMAGE_STORAGE
+
+    # Renditions are served from the local store, so they need a public URL for it
+    def _rendition_specs(self) -> List[RenditionSpec]:
+        if not settings.IMAGE_RENDITIONS:
+            return []
+        if self.image_storage != "local":
+            print("IMAGE_RENDITIONS needs IMAGE_STORAGE=local and IMAGE_PUBLIC_BASE_URL, skipping renditions")
+            return []
+        return load_rendition_specs(settings.IMAGE_RENDITIONS)
 
     # Generate highly creative meme name, ticker, and catchphrase based on news content
     async def _generate_meme_info(self, news: str) -> Dict[str, str]:
-        prompt = f"""Based on this crypto news: "{news}"
-
-    TASK: Create an extremely creative and witty meme coin concept.
-    FORMAT YOUR RESPONSE EXACTLY LIKE THIS - INCLUDE ALL THREE LINES:
-    NAME: [creative, memorable name that relates to the news]
-    TICKER: [clever ticker symbol that relates to the name]
-    PHRASE: [witty catchphrase with relevant emoji, avoid generic phrases]
-
-    EXAMPLES OF GOOD RESPONSES:
-    For bullish news:
-    NAME: MoonBrain
-    TICKER: SMART
-    PHRASE: using galaxy brain moves 🧠✨
-
-    For bearish news:
-    NAME: DumpsterDive
-    TICKER: OUCH
-    PHRASE: catching falling knives with style 🔪💫
-
-    For neutral news:
-    NAME: CryptoYoga
-    TICKER: BEND
-    PHRASE: flexible like my portfolio 🧘‍♂️💰
-
-    RULES:
-    1. Be extremely creative and witty - no generic responses
-    2. NAME must be clever and memorable (3-32 chars)
-    3. TICKER must be witty and relevant (3-6 chars, all CAPS)
-    4. PHRASE must be unique and funny - NO "to the moon" unless news is literally about space
-    5. Use varied emojis - mix common and uncommon ones
-    6. Match the tone of the news (bullish/bearish/neutral/funny)
-    7. Create unexpected but relevant connections"""
-                
+        use_grammar = settings.INFERENCE_JSON_GRAMMAR and self.inference.supports_grammar
+        output_format = MEME_INFO_FORMAT_JSON if use_grammar else MEME_INFO_FORMAT_LINES
+        prompt = PROMPTS.render("meme_info_json" if use_grammar else "meme_info", news=news)
+
+        parameters = dict(
+            max_new_tokens=150,
+            temperature=1,  # Higher temperature for more creativity
+            top_p=0.95,
+            repetition_penalty=1.3,  # Reduce repetitive responses
+        )
+        if use_grammar:
+            parameters["grammar"] = {"type": "json", "value": MEME_INFO_SCHEMA}
+
+        partial: Dict[str, Optional[str]] = {}
+        for attempt in range(max(0, settings.MEME_INFO_MAX_RETRIES) + 1):
+            if attempt:
+                self.parse_stats.retries += 1
+                prompt = PROMPTS.render("meme_info_retry", news=news, output_format=output_format.strip())
+
+            started = time.perf_counter()
+            try:
+                async with self.guards["text"].call():
+                    with span("text"):
+                        response = await self.inference.text_generation(
+                            prompt,
+                            timeout=settings.INFERENCE_TEXT_TIMEOUT,
+                            **parameters
+                        )
+            except Exception as e:
+                self.parse_stats.call_failures += 1
+                print(f"Error generating meme info: {str(e)}")
+                break
+
+            self.parse_stats.attempts += 1
+            info = parse_meme_info(response)
+            try:
+                return validate_meme_info(info)
+            except MemeInfoError as e:
+                self.parse_stats.parse_failures += 1
+                self.parse_stats.wasted_seconds += time.perf_counter() - started
+                print(f"Unusable meme info on attempt {attempt + 1}: {str(e)}")
+                partial.update({key: value for key, value in info.items() if value})
+
+        # Provide fallback values for common failure cases
+        self.parse_stats.fallbacks += 1
+        return fallback_meme_info(partial)
+
+    # Generate meme info for several headlines with one LLM call.
+    # Items the response doesn't cover cleanly come back as None.
+    async def _generate_meme_info_batch(self, news_list: List[str]) -> List[Optional[Dict[str, str]]]:
+        headlines = "\n".join(f'    [{i}] "{news}"' for i, news in enumerate(news_list, 1))
+        prompt = PROMPTS.render("meme_info_batch", headlines=headlines)
+
         try:
-            # Generate response with higher temperature for more creativity
-            response = await asyncio.to_thread(
-                self.text_client.text_generation,
-                prompt,
-                max_new_tokens=150,
-                temperature=1,
-                top_p=0.95,
-                repetition_penalty=1.3,  # Reduce repetitive responses
-                #frequency_penalty=0.5 # Reduce common phrases
-            )
-            
-            # Clean up response text
-            response_text = response.strip()
-            lines = [line.strip() for line in response_text.split('\n') if line.strip()]
-            
-            # Initialize variables
-            name = ticker = phrase = None
-            
-            # Parse response more strictly
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                if line.upper().startswith('NAME:'):
-                    name = line.split(':', 1)[1].strip()
-                elif line.upper().startswith('TICKER:'):
-                    ticker = line.split(':', 1)[1].strip()
-                elif line.upper().startswith('PHRASE:'):
-                    phrase = line.split(':', 1)[1].strip()
-            
-            # Validate all components
-            if not all([name, ticker, phrase]):
-                print(f"Missing components in response. Got:\nname: {name}\nticker: {ticker}\nphrase: {phrase}")
-                raise ValueError("Incomplete response from AI")
-                
-            # Additional validation
-            if not (3 <= len(name) <= 32):
-                raise ValueError(f"Name length invalid: {len(name)} chars")
-            if not (3 <= len(ticker) <= 6):
-                raise ValueError(f"Ticker length invalid: {len(ticker)} chars")
-            if not ticker.isupper():
-                ticker = ticker.upper()
-                
-            # Add default emoji if none present
-            if '🚀' not in phrase and '📈' not in phrase:
-                phrase = f"{phrase} 🚀"
-                
-            return {
-                "name": name,
-                "ticker": ticker,
-                "phrase": phrase
-            }
-                
+            async with self.guards["text"].call():
+                with span("text_batch"):
+                    response = await self.inference.text_generation(
+                        prompt,
+                        timeout=settings.INFERENCE_TEXT_TIMEOUT,
+                        max_new_tokens=80 * len(news_list),
+                        temperature=1,
+                        top_p=0.95,
+                        repetition_penalty=1.3
+                    )
         except Exception as e:
-            print(f"Error generating meme info: {str(e)}")
-            print(f"Raw AI response:\n{response_text}")
-            
-            # Provide fallback values for common failure cases
-            if not name or not (3 <= len(name) <= 32):
-                name = "CryptoMeme"
-            if not ticker or not (3 <= len(ticker) <= 6):
-                ticker = "MEME"
-            if not phrase:
-                phrase = "to the moon! 🚀"
-                
-            return {
-                "name": name,
-                "ticker": ticker,
-                "phrase": phrase
-            }
-            
-    # Generate size-optimized meme image using AI model
-    async def _generate_meme_image(self, news: str, name: str) -> Optional[bytes]:
+            print(f"Error generating batched meme info: {str(e)}")
+            return [None] * len(news_list)
+
+        blocks = split_batch_items(response)
+        results = []
+        for index in range(1, len(news_list) + 1):
+            try:
+                info = parse_meme_info(blocks[index])
+                results.append(validate_meme_info(info))
+            except (KeyError, MemeInfoError):
+                results.append(None)
+        return results
+
+    # Generate meme info with one batched LLM call per text_batch_size headlines.
+    # Items the responses don't cover cleanly come back as None.
+    async def _generate_meme_info_chunks(self, news_list: List[str]) -> List[Optional[Dict[str, str]]]:
+        size = self.text_batch_size
+        chunks = [news_list[i:i + size] for i in range(0, len(news_list), size)]
+        batched = await asyncio.gather(*(self._generate_meme_info_batch(chunk) for chunk in chunks))
+        return [info for chunk in batched for info in chunk]
+
+    # Generate size-optimized meme image and its renditions using AI model.
+    # Returns encoded bytes by rendition name; "image" is the primary JPEG.
+    async def _generate_meme_image(self, news: str, name: str) -> Optional[Dict[str, bytes]]:
         try:
-            base_prompt = f"Create a funny crypto meme about {name}. Context: {news}"
-            style_prompt = """
-            Style guide:
-            - Vibrant colors
-            - Clean design
-            - Crypto symbols
-            - Meme style
-            - Fun visual elements
-            - No text overlay
-            """
-            
-            final_prompt = f"{base_prompt}\n{style_prompt}"
-            
+            final_prompt = PROMPTS.render("meme_image", name=name, news=news)
+
             # Generate initial image with exact 500x500 dimensions
-            response = await asyncio.to_thread(
-                self.image_client.text_to_image,
-                final_prompt,
-                max_new_tokens=None,
-                temperature=0.9,
-                num_inference_steps=30,  # Reduced for faster generation
-                size={
-                    "width": 500,
-                    "height": 500
-                }
-            )
+            async with self.guards["image"].call():
+                with span("image"):
+                    response = await self.inference.text_to_image(
+                        final_prompt,
+                        timeout=settings.INFERENCE_IMAGE_TIMEOUT,
+                        temperature=0.9,
+                        num_inference_steps=30,  # Reduced for faster generation
+                        width=500,
+                        height=500
+                    )
             
             if response:
-                import io
-                from PIL import Image
-                
-                # Convert to PIL Image if it's not already
-                if not isinstance(response, Image.Image):
-                    image = Image.open(io.BytesIO(response))
-                else:
-                    image = response
-                
-                # Ensure exact 500x500 size
-                if image.size != (500, 500):
-                    image = image.resize((500, 500), Image.Resampling.LANCZOS)
-                
-                # Convert to RGB if needed
-                if image.mode in ('RGBA', 'P'):
-                    image = image.convert('RGB')
-                
-                # Save with optimization
-                img_byte_arr = io.BytesIO()
-                image.save(
-                    img_byte_arr, 
-                    format='JPEG',  # Using JPEG for smaller file size
-                    optimize=True,
-                    quality=85,     # Good balance of quality and size
-                    progressive=True  # Progressive loading
-                )
-                
+                # Decode once, then resize and encode every rendition off the event loop
+                with span("image_processing"):
+                    images = await run_image_task(render_image, response, self.image_specs)
+
                 # Verify final size
-                final_size = len(img_byte_arr.getvalue()) / 1024  # Size in KB
-                print(f"Final image size: {final_size:.2f}KB")
-                
-                return img_byte_arr.getvalue()
+                sizes = ", ".join(f"{name} {len(data) / 1024:.2f}KB" for name, data in images.items())
+                print(f"Final image sizes: {sizes}")
+
+                return images
                 
             return None
                 
@@ -198,71 +222,421 @@ class NewsToAIService:
             print(f"Image generation error: {str(e)}")
             return None
 
-    # Upload image to cloud storage
-    async def _upload_to_image(self, image_bytes: bytes) -> Optional[str]:
+    # Store the image and return its public URL. In "local" mode the image is
+    # served from our own content-addressed store and the external upload, if
+    # enabled, runs in the background off the critical path.
+    async def _store_image(self, image_bytes: bytes) -> Optional[str]:
+        if self.image_storage != "local":
+            return await self._upload_to_image(image_bytes)
+
+        store = get_image_store()
         try:
-            if not isinstance(image_bytes, bytes):
-                print("Error: image_bytes must be bytes")
+            with span("store"):
+                key = await store.put(image_bytes)
+        except Exception as e:
+            print(f"Image store error: {str(e)}")
+            return None
+
+        if settings.IMAGE_MIRROR_UPLOAD:
+            task = asyncio.ensure_future(self._upload_to_image(image_bytes))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+        return store.url(key)
+
+    # Store renditions in the local image store; one failing is logged and left out
+    async def _store_renditions(self, renditions: Dict[str, bytes]) -> Dict[str, str]:
+        store = get_image_store()
+        extensions = {spec.name: spec.extension for spec in self.image_specs}
+        names = list(renditions)
+        with span("store"):
+            keys = await asyncio.gather(
+                *(store.put(renditions[name], extensions[name]) for name in names),
+                return_exceptions=True
+            )
+
+        urls = {}
+        for name, key in zip(names, keys):
+            if isinstance(key, Exception):
+                print(f"Rendition store error for {name}: {str(key)}")
+                continue
+            urls[name] = store.url(key, extensions[name])
+        return urls
+
+    # Upload image to cloud storage, retrying transient failures with the same bytes
+    async def _upload_to_image(self, image_bytes: bytes) -> Optional[str]:
+        if not isinstance(image_bytes, bytes):
+            print("Error: image_bytes must be bytes")
+            return None
+
+        params = {
+            'key': self.upload_api_key
+        }
+
+        # Base64 form field only for hosts that can't take a binary file
+        b64_image = None
+        if not settings.UPLOAD_MULTIPART:
+            b64_image = await run_image_task(encode_base64, image_bytes)
+
+        attempts = max(1, settings.UPLOAD_MAX_ATTEMPTS)
+        for attempt in range(attempts):
+            if attempt:
+                await asyncio.sleep(upload_backoff(attempt))
+
+            try:
+                if b64_image is None:
+                    # Raw bytes streamed as a multipart file part
+                    request = dict(files={'image': ('meme.jpg', io.BytesIO(image_bytes), 'image/jpeg')})
+                else:
+                    request = dict(data={'image': b64_image})
+
+                async with self.guards["upload"].call() as outcome:
+                    with span("upload"):
+                        response = await get_http_client().post(
+                            self.upload_api_url,
+                            params=params,
+                            timeout=settings.UPLOAD_TIMEOUT,
+                            **request
+                        )
+                    outcome.status(response.status_code)
+            except httpx.TransportError as e:
+                print(f"Upload error (attempt {attempt + 1}/{attempts}): {str(e)}")
+                continue
+            except Exception as e:
+                print(f"Upload error: {str(e)}")
                 return None
-                
-            # Convert to base64
-            b64_image = base64.b64encode(image_bytes).decode('utf-8')
-            
-            params = {
-                'key': self.upload_api_key
-            }
-            
-            data = aiohttp.FormData()
-            data.add_field('image', b64_image)
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.upload_api_url,
-                    params=params,
-                    data=data,
-                    timeout=30
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        if result.get('success'):
-                            return result['data']['url']
-                        print(f"Upload failed: {result.get('error', 'Unknown error')}")
-                    else:
-                        print(f"Upload failed with status {response.status}")
+
+            if response.status_code == 200:
+                try:
+                    result = response.json()
+                except ValueError:
+                    print("Upload failed: invalid JSON response")
                     return None
-                        
-        except Exception as e:
-            print(f"Upload error: {str(e)}")
+                if result.get('success'):
+                    return result['data']['url']
+                print(f"Upload failed: {result.get('error', 'Unknown error')}")
+                return None
+
+            if response.status_code in RETRYABLE_UPLOAD_STATUSES:
+                print(f"Upload failed with status {response.status_code} (attempt {attempt + 1}/{attempts})")
+                continue
+
+            print(f"Upload failed with status {response.status_code}")
             return None
 
-    # Generate a complete meme from news
-    async def generate_meme(self, news: str) -> MemeResponse:
-        # Generate meme info
-        meme_info = await self._generate_meme_info(news)
-        
-        # Generate and upload image
-        image_bytes = await self._generate_meme_image(news, meme_info['name'])
-        if not image_bytes:
-            raise Exception("Failed to generate image")
-        
-        image_url = await self._upload_to_image(image_bytes)
-        if not image_url:
-            raise Exception("Failed to upload image")
-        
+        return None
+
+    # Build the API response from generated parts
+    def _build_response(self, news: str, meme_info: Dict[str, str], image_url: str,
+                        images: Optional[Dict[str, str]] = None) -> MemeResponse:
         return MemeResponse(
             news=news,
             name=meme_info['name'],
             ticker=meme_info['ticker'],
             image=image_url,
+            images=images or {},
             meme=f"{meme_info['name']} ({meme_info['ticker']}) {meme_info['phrase']}",
             timestamp=datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
         )
 
-    # Process multiple news items
-    async def process_news_batch(self, news_list: list[str], delay: int = 5) -> list[MemeResponse]:
-        memes = []
-        for news in news_list:
-            meme = await self.generate_meme(news)
-            memes.append(meme)
-            await asyncio.sleep(delay)  # Configurable delay
-        return memes
\ No newline at end of file
+    # Generate a complete meme from news, reusing a cached or in-flight result
+    async def generate_meme(self, news: str) -> MemeResponse:
+        result = await self.generate_meme_item(news)
+        if result.status == "failed":
+            raise Exception(result.error)
+        return result.meme
+
+    # Generate one meme as a per-item result carrying status, error and timings
+    async def generate_meme_item(self, news: str) -> MemeItemResult:
+        cached = await self.meme_cache.get(news)
+        if cached:
+            return self._cached_result(news, cached)
+
+        result = await self.inflight.do(
+            normalize_news(news),
+            lambda: self._generate_and_cache(news)
+        )
+        return self._for_news(result, news)
+
+    async def _generate_and_cache(self, news: str) -> MemeItemResult:
+        result = await self._generate_item(news)
+        if result.status == "ok":
+            await self.meme_cache.set(news, result.meme)
+        return result
+
+    # Run text, image and upload for one news item
+    async def _generate_item(self, news: str) -> MemeItemResult:
+        work = MemeWork(news)
+        try:
+            await self._run_step("text", self._text_step, work)
+            await self._run_step("image", self._image_step, work)
+            await self._run_step("upload", self._store_step, work)
+        except Exception as e:
+            return self._finish(e)
+        return self._finish(work)
+
+    async def _text_step(self, work: "MemeWork") -> None:
+        if work.meme_info is None:
+            self._set_meme_info(work, await self._generate_meme_info(work.news))
+
+    # Stock fallback text still makes a meme, but a degraded one that isn't cached
+    def _set_meme_info(self, work: "MemeWork", meme_info: Dict[str, str]) -> None:
+        work.meme_info = meme_info
+        if isinstance(meme_info, FallbackMemeInfo):
+            work.fallback = "text_fallback"
+            work.error = "Failed to generate meme text"
+
+    async def _image_step(self, work: "MemeWork") -> None:
+        images = await self._generate_meme_image(work.news, work.meme_info['name'])
+        if not images:
+            self._apply_fallback(work, "Failed to generate image")
+            return
+        work.image_bytes = images["image"]
+        work.renditions = {name: data for name, data in images.items() if name != "image"}
+
+    async def _store_step(self, work: "MemeWork") -> None:
+        if work.image_bytes is None:
+            return
+        work.image_url = await self._store_image(work.image_bytes)
+        if not work.image_url:
+            self._apply_fallback(work, "Failed to upload image")
+        elif work.renditions:
+            work.image_urls = await self._store_renditions(work.renditions)
+
+    # Time a step and tag its failure with the item's work so far
+    async def _run_step(self, name: str, step: Callable[["MemeWork"], Awaitable[None]], work: "MemeWork") -> "MemeWork":
+        started = time.perf_counter()
+        try:
+            await step(work)
+        except Exception as e:
+            raise MemeStepError(work, str(e)) from e
+        finally:
+            work.timings[name] = round(time.perf_counter() - started, 4)
+        return work
+
+    # Degrade the item per MEME_FALLBACK instead of failing it
+    def _apply_fallback(self, work: "MemeWork", error: str) -> None:
+        if settings.MEME_FALLBACK == "placeholder" and settings.MEME_PLACEHOLDER_IMAGE_URL:
+            work.fallback = "placeholder_image"
+            work.image_url = settings.MEME_PLACEHOLDER_IMAGE_URL
+        elif settings.MEME_FALLBACK == "text_only":
+            work.fallback = "text_only"
+            work.image_url = ""
+        else:
+            raise Exception(error)
+        work.error = error
+
+    # Turn finished work, or the exception that stopped it, into an item result
+    def _finish(self, outcome: Any) -> MemeItemResult:
+        if isinstance(outcome, MemeStepError):
+            work = outcome.work
+            return MemeItemResult(news=work.news, status="failed", error=str(outcome), timings=work.timings)
+        if isinstance(outcome, BaseException):
+            return MemeItemResult(news="", status="failed", error=str(outcome))
+
+        work = outcome
+        return MemeItemResult(
+            news=work.news,
+            status="degraded" if work.fallback else "ok",
+            meme=self._build_response(work.news, work.meme_info, work.image_url, work.image_urls),
+            error=work.error,
+            fallback=work.fallback,
+            timings=work.timings
+        )
+
+    def _cached_result(self, news: str, meme: MemeResponse) -> MemeItemResult:
+        return MemeItemResult(news=news, status="ok", meme=meme.model_copy(update={"news": news}), cached=True)
+
+    # Shared results carry the leader's headline; report the caller's own
+    def _for_news(self, result: MemeItemResult, news: str) -> MemeItemResult:
+        update = {"news": news}
+        if result.meme is not None:
+            update["meme"] = result.meme.model_copy(update={"news": news})
+        return result.model_copy(update=update)
+
+    # Process multiple news items, keeping input order; failed items are left out
+    async def process_news_batch(self, news_list: List[str], concurrency: Optional[int] = None) -> List[MemeResponse]:
+        results = await self.process_news_batch_detailed(news_list, concurrency)
+        return [result.meme for result in results if result.status != "failed"]
+
+    # Process multiple news items into one result per item, in input order
+    async def process_news_batch_detailed(self, news_list: List[str], concurrency: Optional[int] = None) -> List[MemeItemResult]:
+        flights = await self._start_batch(news_list, concurrency)
+        outcomes = await asyncio.gather(
+            *(self.inflight.join(future) for future in flights),
+            return_exceptions=True
+        )
+
+        results = []
+        for news, outcome in zip(news_list, outcomes):
+            if isinstance(outcome, BaseException):
+                outcome = MemeItemResult(news=news, status="failed", error=str(outcome))
+            result = self._for_news(outcome, news)
+            if result.status == "failed":
+                print(f"Meme generation failed for '{news}': {result.error}")
+            results.append(result)
+        return results
+
+    # Yield (index, result) for each item as soon as it is ready
+    async def iter_news_batch(self, news_list: List[str], concurrency: Optional[int] = None) -> AsyncIterator[Tuple[int, MemeItemResult]]:
+        flights = await self._start_batch(news_list, concurrency)
+
+        async def wait(index: int, future: asyncio.Future) -> Tuple[int, MemeItemResult]:
+            try:
+                result = await self.inflight.join(future)
+            except Exception as e:
+                result = MemeItemResult(news=news_list[index], status="failed", error=str(e))
+            return index, self._for_news(result, news_list[index])
+
+        waits = [asyncio.ensure_future(wait(i, f)) for i, f in enumerate(flights)]
+        try:
+            for next_done in asyncio.as_completed(waits):
+                yield await next_done
+        finally:
+            # A consumer that stops early (e.g. a disconnected stream) stops waiting
+            for task in waits:
+                task.cancel()
+
+    # Return one future per item: cached, joined in-flight or newly started
+    async def _start_batch(self, news_list: List[str], concurrency: Optional[int] = None) -> List[asyncio.Future]:
+        cached = await asyncio.gather(*(self.meme_cache.get(news) for news in news_list))
+        loop = asyncio.get_running_loop()
+
+        # Join generations already in flight and lead the rest
+        flights = []
+        owned = []
+        for news, meme in zip(news_list, cached):
+            if meme is not None:
+                future = loop.create_future()
+                future.set_result(self._cached_result(news, meme))
+                flights.append(future)
+                continue
+            key = normalize_news(news)
+            future = self.inflight.get(key)
+            if future is None:
+                future = self.inflight.claim(key)
+                owned.append((news, future))
+            flights.append(future)
+
+        if owned:
+            # Runs detached so a cancelled request leaves shared work running
+            task = asyncio.ensure_future(self._generate_owned(owned, concurrency))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+            # ...until every item it leads has been abandoned by all waiters
+            def abandon(done: asyncio.Future) -> None:
+                if all(future.cancelled() for _, future in owned):
+                    task.cancel()
+
+            for _, future in owned:
+                future.add_done_callback(abandon)
+
+        return flights
+
+    # Generate the items this batch leads and resolve their shared futures
+    async def _generate_owned(self, owned: list, concurrency: Optional[int] = None) -> None:
+        news_list = [news for news, _ in owned]
+        settling: List[asyncio.Future] = []
+
+        # Cache an ok result before settling its future, which frees the in-flight
+        # key, so later callers always find the item either in flight or cached
+        async def settle(news: str, future: asyncio.Future, result: MemeItemResult) -> None:
+            if result.status == "ok":
+                await self.meme_cache.set(news, result.meme)
+            if not future.done():
+                future.set_result(result)
+
+        def resolve(index: int, result: MemeItemResult) -> None:
+            news, future = owned[index]
+            if future.done():
+                return
+            task = asyncio.ensure_future(settle(news, future, result))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+            settling.append(task)
+
+        try:
+            if self.batch_mode == "pipeline":
+                await self._run_batch_pipeline(news_list, on_result=resolve)
+            else:
+                await self._run_batch_concurrent(news_list, concurrency, on_result=resolve)
+            await asyncio.gather(*settling)
+        except BaseException as e:
+            if not isinstance(e, asyncio.CancelledError):
+                await asyncio.gather(*settling, return_exceptions=True)
+            for _, future in owned:
+                if future.done():
+                    continue
+                if isinstance(e, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(e)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+
+    # Run whole-meme generations side by side, bounded by a semaphore
+    async def _run_batch_concurrent(self, news_list: List[str], concurrency: Optional[int] = None,
+                                    on_result: Optional[Callable[[int, MemeItemResult], None]] = None) -> List[MemeItemResult]:
+        semaphore = asyncio.Semaphore(max(1, concurrency or self.batch_concurrency))
+
+        async def run(index: int, news: str) -> MemeItemResult:
+            async with semaphore:
+                await self.rate_limiter.acquire()
+                result = await self._generate_item(news)
+            if on_result is not None:
+                on_result(index, result)
+            return result
+
+        return await asyncio.gather(*(run(index, news) for index, news in enumerate(news_list)))
+
+    # Run text, image and upload as overlapping stages with their own workers
+    async def _run_batch_pipeline(self, news_list: List[str],
+                                  on_result: Optional[Callable[[int, MemeItemResult], None]] = None) -> List[MemeItemResult]:
+        works = [MemeWork(news) for news in news_list]
+
+        # One batched LLM call covers the text stage for up to text_batch_size items.
+        # Items it misses stay None and the text stage retries them one by one
+        # while parsed items already move on to image generation.
+        if self.text_batch_size > 1 and len(news_list) > 1:
+            await self.rate_limiter.acquire()
+            started = time.perf_counter()
+            infos = await self._generate_meme_info_chunks(news_list)
+            elapsed = round(time.perf_counter() - started, 4)
+            for work, meme_info in zip(works, infos):
+                if meme_info is not None:
+                    self._set_meme_info(work, meme_info)
+                    work.timings["text"] = elapsed
+            missing = sum(1 for meme_info in infos if meme_info is None)
+            if missing:
+                print(f"Batched meme info missed {missing} of {len(news_list)} items, retrying singly")
+
+        async def text_stage(work: MemeWork) -> MemeWork:
+            if work.meme_info is not None:
+                return work
+            await self.rate_limiter.acquire()
+            return await self._run_step("text", self._text_step, work)
+
+        async def image_stage(work: MemeWork) -> MemeWork:
+            return await self._run_step("image", self._image_step, work)
+
+        async def upload_stage(work: MemeWork) -> MemeItemResult:
+            return self._finish(await self._run_step("upload", self._store_step, work))
+
+        def finish(index: int, outcome: Any) -> None:
+            if on_result is not None:
+                on_result(index, outcome if isinstance(outcome, MemeItemResult) else self._finish(outcome))
+
+        results = await run_pipeline(
+            works,
+            [
+                Stage("text", text_stage, settings.MEME_PIPELINE_TEXT_CONCURRENCY),
+                Stage("image", image_stage, settings.MEME_PIPELINE_IMAGE_CONCURRENCY),
+                Stage("upload", upload_stage, settings.MEME_PIPELINE_UPLOAD_CONCURRENCY),
+            ],
+            queue_size=settings.MEME_PIPELINE_QUEUE_SIZE,
+            on_result=finish
+        )
+        return [
+            result if isinstance(result, MemeItemResult) else self._finish(result)
+            for result in results
+        ]
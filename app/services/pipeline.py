@@ -0,0 +1,77 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, List, Optional, Sequence
+
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """One step of a pipeline, run by ``concurrency`` workers."""
+    name: str
+    handler: Callable[[Any], Awaitable[Any]]
+    concurrency: int = 1
+
+
+# Run items through stages connected by bounded queues
+async def run_pipeline(items: Sequence[Any], stages: Sequence[Stage], queue_size: int = 1,
+                       on_result: Optional[Callable[[int, Any], None]] = None) -> List[Any]:
+    """Return one result per item, in input order.
+
+    A stage that raises for an item stores the exception in that item's slot
+    and the item leaves the pipeline; the other items are unaffected.
+    ``on_result(index, result)`` is called as soon as each item finishes.
+    """
+    results: List[Any] = [None] * len(items)
+    if not items:
+        return results
+
+    def finish(index: int, result: Any) -> None:
+        results[index] = result
+        if on_result is not None:
+            on_result(index, result)
+
+    queues = [asyncio.Queue(maxsize=max(1, queue_size)) for _ in stages]
+
+    async def produce() -> None:
+        for index, item in enumerate(items):
+            await queues[0].put((index, item))
+        for _ in range(max(1, stages[0].concurrency)):
+            await queues[0].put(_DONE)
+
+    async def work(stage: Stage, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue]) -> None:
+        while True:
+            entry = await inbox.get()
+            if entry is _DONE:
+                return
+            index, value = entry
+            try:
+                value = await stage.handler(value)
+            except Exception as e:
+                finish(index, e)
+                continue
+            if outbox is None:
+                finish(index, value)
+            else:
+                await outbox.put((index, value))
+
+    async def run_stage(position: int) -> None:
+        stage = stages[position]
+        outbox = queues[position + 1] if position + 1 < len(stages) else None
+        await asyncio.gather(*(
+            work(stage, queues[position], outbox)
+            for _ in range(max(1, stage.concurrency))
+        ))
+        if outbox is not None:
+            for _ in range(max(1, stages[position + 1].concurrency)):
+                await outbox.put(_DONE)
+
+    tasks = [asyncio.ensure_future(produce())]
+    tasks += [asyncio.ensure_future(run_stage(i)) for i in range(len(stages))]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    return results
@@ -0,0 +1,66 @@
+import asyncio
+from typing import Optional, Set
+from app.config.settings import settings
+from app.services.news_service import NewsService
+from app.services.news_to_ai_service import NewsToAIService
+from app.services.meme_cache import normalize_news
+
+
+class MemePrecomputer:
+    """Background worker that keeps memes for the latest news warm.
+
+    Every ``interval`` seconds it fetches the news feed and generates memes
+    for headlines it has not handled yet. Results land in the meme result
+    cache, which ``process_news_batch`` checks before generating live.
+    """
+
+    def __init__(self, news_service: NewsService, news_to_ai_service: NewsToAIService,
+                 interval: Optional[float] = None):
+        self.news_service = news_service
+        self.news_to_ai_service = news_to_ai_service
+        self.interval = settings.PRECOMPUTE_INTERVAL if interval is None else interval
+        self._seen: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"Precompute error: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    # Generate memes for headlines not seen before; returns how many were new
+    async def run_once(self) -> int:
+        news_list = await self.news_service.fetch_news()
+        if not news_list:
+            return 0
+
+        titles = [news['title'] for news in news_list]
+        new_titles = [title for title in titles if normalize_news(title) not in self._seen]
+        if not new_titles:
+            return 0
+
+        # Degraded and failed items aren't cached, so they're tried again next run
+        results = await self.news_to_ai_service.process_news_batch_detailed(new_titles)
+        ready = [result for result in results if result.status == "ok"]
+        for result in ready:
+            self._seen.add(normalize_news(result.news))
+
+        # Only remember the current feed so the set stays bounded
+        self._seen &= {normalize_news(title) for title in titles}
+        print(f"Precomputed {len(ready)} of {len(new_titles)} new memes")
+        return len(ready)
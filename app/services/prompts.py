@@ -0,0 +1,157 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """A prompt split into a static prefix and a per-call body.
+
+    The prefix holds the instructions, examples and rules and is identical
+    for every call, so backends with prefix caching (e.g. TGI, vLLM) reuse
+    its KV cache. Only ``body`` is formatted with the call's values. Bump
+    ``version`` on any wording change so cached memes are regenerated.
+    """
+    name: str
+    version: int
+    prefix: str
+    body: str
+
+    def render(self, **values: str) -> str:
+        return self.prefix + self.body.format(**values)
+
+    @property
+    def tag(self) -> str:
+        return f"{self.name}@v{self.version}"
+
+
+class PromptRegistry:
+    """Named prompt templates, built once at import."""
+
+    def __init__(self, templates: Iterable[PromptTemplate] = ()):
+        self._templates: Dict[str, PromptTemplate] = {}
+        for template in templates:
+            self.register(template)
+
+    def register(self, template: PromptTemplate) -> PromptTemplate:
+        self._templates[template.name] = template
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        return self._templates[name]
+
+    # Template name is positional-only so values may include a "name" field
+    def render(self, template: str, /, **values: str) -> str:
+        return self._templates[template].render(**values)
+
+    # Versions of the given templates (all by default), for cache keys
+    def version_key(self, names: Optional[List[str]] = None) -> str:
+        names = sorted(self._templates) if names is None else names
+        return ",".join(self._templates[name].tag for name in names)
+
+    def versions(self) -> Dict[str, int]:
+        return {name: template.version for name, template in sorted(self._templates.items())}
+
+
+# Examples and rules shared by the single and batched meme info prompts
+MEME_INFO_GUIDE = """    EXAMPLES OF GOOD RESPONSES:
+    For bullish news:
+    NAME: MoonBrain
+    TICKER: SMART
+    PHRASE: using galaxy brain moves 🧠✨
+
+    For bearish news:
+    NAME: DumpsterDive
+    TICKER: OUCH
+    PHRASE: catching falling knives with style 🔪💫
+
+    For neutral news:
+    NAME: CryptoYoga
+    TICKER: BEND
+    PHRASE: flexible like my portfolio 🧘‍♂️💰
+
+    RULES:
+    1. Be extremely creative and witty - no generic responses
+    2. NAME must be clever and memorable (3-32 chars)
+    3. TICKER must be witty and relevant (3-6 chars, all CAPS)
+    4. PHRASE must be unique and funny - NO "to the moon" unless news is literally about space
+    5. Use varied emojis - mix common and uncommon ones
+    6. Match the tone of the news (bullish/bearish/neutral/funny)
+    7. Create unexpected but relevant connections"""
+
+MEME_INFO_FORMAT_LINES = """    FORMAT YOUR RESPONSE EXACTLY LIKE THIS - INCLUDE ALL THREE LINES:
+    NAME: [creative, memorable name that relates to the news]
+    TICKER: [clever ticker symbol that relates to the name]
+    PHRASE: [witty catchphrase with relevant emoji, avoid generic phrases]"""
+
+MEME_INFO_FORMAT_JSON = """    RESPOND WITH ONE JSON OBJECT WITH ALL THREE KEYS:
+    {"name": "creative, memorable name that relates to the news",
+     "ticker": "clever ticker symbol that relates to the name",
+     "phrase": "witty catchphrase with relevant emoji, avoid generic phrases"}"""
+
+MEME_INFO_BATCH_FORMAT = """    FORMAT YOUR RESPONSE EXACTLY LIKE THIS - ONE BLOCK PER HEADLINE, IN ORDER, INCLUDE ALL THREE LINES:
+    [1]
+    NAME: [creative, memorable name that relates to the news]
+    TICKER: [clever ticker symbol that relates to the name]
+    PHRASE: [witty catchphrase with relevant emoji, avoid generic phrases]
+    [2]
+    ..."""
+
+MEME_IMAGE_STYLE = """
+            Style guide:
+            - Vibrant colors
+            - Clean design
+            - Crypto symbols
+            - Meme style
+            - Fun visual elements
+            - No text overlay
+            """
+
+PROMPTS = PromptRegistry([
+    PromptTemplate(
+        name="meme_info",
+        version=2,
+        prefix=f"""    TASK: Create an extremely creative and witty meme coin concept for the crypto news below.
+{MEME_INFO_FORMAT_LINES}
+
+{MEME_INFO_GUIDE}
+
+""",
+        body='Crypto news: "{news}"'
+    ),
+    PromptTemplate(
+        name="meme_info_json",
+        version=2,
+        prefix=f"""    TASK: Create an extremely creative and witty meme coin concept for the crypto news below.
+{MEME_INFO_FORMAT_JSON}
+
+{MEME_INFO_GUIDE}
+
+""",
+        body='Crypto news: "{news}"'
+    ),
+    # Shorter re-prompt: the examples and rules were already ignored once
+    PromptTemplate(
+        name="meme_info_retry",
+        version=1,
+        prefix="",
+        body='Crypto news: "{news}"\nInvent a witty meme coin for it.\n{output_format}'
+    ),
+    PromptTemplate(
+        name="meme_info_batch",
+        version=2,
+        prefix=f"""    TASK: Create an extremely creative and witty meme coin concept for EACH crypto news headline below.
+{MEME_INFO_BATCH_FORMAT}
+
+{MEME_INFO_GUIDE}
+
+""",
+        body="Crypto news headlines:\n{headlines}"
+    ),
+    # Diffusion models don't cache prefixes; the template still pins the wording
+    PromptTemplate(
+        name="meme_image",
+        version=1,
+        prefix="",
+        body="Create a funny crypto meme about {name}. Context: {news}\n" + MEME_IMAGE_STYLE
+    ),
+])
@@ -0,0 +1,215 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict
+import httpx
+from app.config.settings import settings
+from app.services.metrics import BACKEND_CIRCUIT_STATE, BACKEND_CONCURRENCY_LIMIT
+
+OVERLOAD_STATUSES = {429, 503}
+_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend whose circuit is open."""
+
+
+# Whether an exception means the backend is overloaded rather than broken
+def is_overload(error: BaseException) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, httpx.TimeoutException)):
+        return True
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) in OVERLOAD_STATUSES
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures.
+
+    While open, calls fail fast. After ``reset_timeout`` seconds one trial
+    call is let through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        BACKEND_CIRCUIT_STATE.set(_STATE_VALUES[state], backend=self.name)
+
+    # Raise CircuitOpenError unless a call may go ahead now
+    def check(self) -> None:
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError(f"{self.name} circuit is open")
+            self._set_state("half_open")
+            self._trial_in_flight = False
+
+        if self.state == "half_open":
+            if self._trial_in_flight:
+                raise CircuitOpenError(f"{self.name} circuit is half-open, trial call in progress")
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._trial_in_flight = False
+        if self.state != "closed":
+            self._set_state("closed")
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._set_state("open")
+
+    # A cancelled call says nothing about the backend; free the trial slot
+    def record_cancel(self) -> None:
+        self._trial_in_flight = False
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit.
+
+    Each fast, successful call raises the limit by ``1 / limit`` (about one
+    per window of calls). An overload (429/503/timeout) or a call slower than
+    ``target_latency`` multiplies it by ``decrease``.
+    """
+
+    def __init__(self, name: str, initial: float, minimum: float, maximum: float,
+                 target_latency: float, decrease: float = 0.5):
+        self.name = name
+        self.minimum = max(1.0, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(self.maximum, max(self.minimum, initial))
+        self.target_latency = target_latency
+        self.decrease = decrease
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        BACKEND_CONCURRENCY_LIMIT.set(self.limit, backend=name)
+
+    async def acquire(self) -> None:
+        while self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except BaseException:
+                if waiter.done() and not waiter.cancelled():
+                    # Woken just as we were cancelled; pass the wakeup on
+                    self._wake()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.in_flight += 1
+
+    # A cancelled call says nothing about the backend and leaves the limit alone
+    def release(self, latency: float, failed: bool = False, overloaded: bool = False,
+                cancelled: bool = False) -> None:
+        self.in_flight -= 1
+        if not cancelled:
+            if overloaded or latency > self.target_latency:
+                self.limit = max(self.minimum, self.limit * self.decrease)
+            elif not failed:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        BACKEND_CONCURRENCY_LIMIT.set(self.limit, backend=self.name)
+        self._wake()
+
+    # Wake as many waiters as there are free slots
+    def _wake(self) -> None:
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+
+class CallOutcome:
+    """Lets guarded code report a failure that didn't raise (e.g. a 503 response)."""
+
+    def __init__(self):
+        self.failed = False
+        self.overloaded = False
+
+    def fail(self, overloaded: bool = False) -> None:
+        self.failed = True
+        self.overloaded = self.overloaded or overloaded
+
+    def status(self, status_code: int) -> None:
+        if status_code >= 500 or status_code in OVERLOAD_STATUSES:
+            self.fail(overloaded=status_code in OVERLOAD_STATUSES)
+
+
+class BackendGuard:
+    """Circuit breaker plus adaptive concurrency limit for one backend."""
+
+    def __init__(self, name: str, target_latency: float):
+        self.name = name
+        self.breaker = CircuitBreaker(
+            name,
+            failure_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.BREAKER_RESET_TIMEOUT
+        )
+        self.limiter = AdaptiveLimiter(
+            name,
+            initial=settings.ADAPTIVE_INITIAL_LIMIT,
+            minimum=settings.ADAPTIVE_MIN_LIMIT,
+            maximum=settings.ADAPTIVE_MAX_LIMIT,
+            target_latency=target_latency,
+            decrease=settings.ADAPTIVE_DECREASE
+        )
+
+    # Guard one backend call; fails fast with CircuitOpenError when open
+    @asynccontextmanager
+    async def call(self) -> AsyncIterator[CallOutcome]:
+        self.breaker.check()
+        try:
+            await self.limiter.acquire()
+        except BaseException:
+            self.breaker.record_cancel()
+            raise
+
+        outcome = CallOutcome()
+        started = time.perf_counter()
+        finished = False
+        try:
+            yield outcome
+            finished = True
+        except Exception as e:
+            outcome.fail(overloaded=is_overload(e))
+            finished = True
+            raise
+        finally:
+            self.limiter.release(time.perf_counter() - started, outcome.failed, outcome.overloaded,
+                                 cancelled=not finished)
+            if not finished:
+                self.breaker.record_cancel()
+            elif outcome.failed:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "concurrency_limit": round(self.limiter.limit, 2),
+            "in_flight": self.limiter.in_flight,
+        }
+
+
+# One guard per backend: text model, image model and image uploader
+def create_backend_guards() -> Dict[str, BackendGuard]:
+    return {
+        "text": BackendGuard("text", settings.ADAPTIVE_TEXT_TARGET_LATENCY),
+        "image": BackendGuard("image", settings.ADAPTIVE_IMAGE_TARGET_LATENCY),
+        "upload": BackendGuard("upload", settings.ADAPTIVE_UPLOAD_TARGET_LATENCY),
+    }
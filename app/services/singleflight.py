@@ -0,0 +1,68 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class SingleFlight:
+    """Coalesce concurrent work for the same key into one shared future.
+
+    Callers wait on the shared future through ``join``, which shields it, so
+    a cancelled caller stops waiting without cancelling the work for others.
+    When the last waiter gives up, nobody wants the result and the work is
+    cancelled.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._keys: Dict[asyncio.Future, Hashable] = {}
+        self._waiters: Dict[asyncio.Future, int] = {}
+
+    # Return the in-flight future for key, if any
+    def get(self, key: Hashable) -> Optional[asyncio.Future]:
+        return self._inflight.get(key)
+
+    # Run fn as the shared work for key
+    def start(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        return self._register(key, asyncio.ensure_future(fn()))
+
+    # Register a bare future for key; the caller must resolve it
+    def claim(self, key: Hashable) -> asyncio.Future:
+        return self._register(key, asyncio.get_running_loop().create_future())
+
+    # Join the in-flight work for key or start it
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self.get(key) or self.start(key, fn)
+        return await self.join(future)
+
+    # Wait for a shared future; cancel it if this was its last waiter and it gave up
+    async def join(self, future: asyncio.Future) -> Any:
+        self._waiters[future] = self._waiters.get(future, 0) + 1
+        try:
+            return await asyncio.shield(future)
+        finally:
+            remaining = self._waiters.pop(future) - 1
+            if remaining:
+                self._waiters[future] = remaining
+            elif not future.done():
+                # A cancelled task can take a while to finish; don't let new callers join it
+                self._forget(future)
+                future.cancel()
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def _register(self, key: Hashable, future: asyncio.Future) -> asyncio.Future:
+        self._inflight[key] = future
+        self._keys[future] = key
+        future.add_done_callback(lambda done: self._release(key, done))
+        return future
+
+    def _forget(self, future: asyncio.Future) -> None:
+        key = self._keys.pop(future, None)
+        if key is not None and self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    def _release(self, key: Hashable, future: asyncio.Future) -> None:
+        self._forget(future)
+        # Mark the outcome as retrieved even if every waiter gave up
+        if not future.cancelled():
+            future.exception()
@@ -0,0 +1,35 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+from app.config.settings import settings
+from app.services.http_client import get_http_client
+from app.services.image_processing import run_image_task, warm_image_worker
+from app.services.metrics import STARTUP_PHASE_SECONDS
+
+
+# Time a startup phase into timings and the startup_phase_seconds gauge
+@contextmanager
+def startup_phase(timings: Dict[str, float], name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - started
+        STARTUP_PHASE_SECONDS.set(timings[name], phase=name)
+
+
+# Pay one-off costs before the first request instead of during it
+async def warm_up(timings: Dict[str, float]) -> Dict[str, float]:
+    with startup_phase(timings, "http_client"):
+        get_http_client()
+
+    # Start every image worker and load Pillow's codecs in it
+    with startup_phase(timings, "image_executor"):
+        workers = 1 if settings.IMAGE_EXECUTOR == "inline" else max(1, settings.IMAGE_EXECUTOR_WORKERS)
+        await asyncio.gather(*(run_image_task(warm_image_worker) for _ in range(workers)))
+    return timings
+
+
+def format_timings(timings: Dict[str, float]) -> str:
+    return ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in timings.items())
@@ -0,0 +1,111 @@
+"""Local fakes of the news API, the inference endpoints and the image host.
+
+All external calls go through the shared httpx client, so the fakes are one
+``httpx.MockTransport`` that routes by host. Each backend has its own latency
+and failure rate.
+"""
+import asyncio
+import io
+import json
+import random
+import re
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict
+import httpx
+
+NEWS_URL = "http://news.bench/api/posts"
+INFERENCE_URL = "http://inference.bench/models"
+UPLOAD_URL = "http://upload.bench/1/upload"
+
+_BATCH_ITEM = re.compile(r'^\s*\[(\d+)\]\s*"', re.MULTILINE)
+
+
+@dataclass
+class BackendProfile:
+    """Latency (seconds, uniform in [latency - jitter, latency + jitter]) and failure rate."""
+    latency: float = 0.0
+    jitter: float = 0.0
+    failure_rate: float = 0.0
+
+    async def wait(self) -> None:
+        delay = max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+        if delay:
+            await asyncio.sleep(delay)
+
+    def fails(self) -> bool:
+        return random.random() < self.failure_rate
+
+
+@dataclass
+class FakeBackends:
+    news: BackendProfile = field(default_factory=lambda: BackendProfile(0.05, 0.02))
+    text: BackendProfile = field(default_factory=lambda: BackendProfile(0.8, 0.3))
+    image: BackendProfile = field(default_factory=lambda: BackendProfile(2.0, 0.5))
+    upload: BackendProfile = field(default_factory=lambda: BackendProfile(0.3, 0.1))
+    headlines: int = 6
+    calls: Dict[str, int] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self._image = _make_image()
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        if host == "news.bench":
+            return await self._serve("news", self.news, self._news)
+        if host == "inference.bench":
+            if request.url.path.endswith("/image-model"):
+                return await self._serve("image", self.image, lambda: self._text_to_image())
+            return await self._serve("text", self.text, lambda: self._text_generation(request))
+        if host == "upload.bench":
+            return await self._serve("upload", self.upload, self._upload)
+        return httpx.Response(404)
+
+    async def _serve(self, name, profile: BackendProfile, respond) -> httpx.Response:
+        self.calls[name] = self.calls.get(name, 0) + 1
+        await profile.wait()
+        if profile.fails():
+            return httpx.Response(503, json={"error": f"{name} unavailable"})
+        return respond()
+
+    @staticmethod
+    def _word() -> str:
+        return uuid.uuid4().hex[:8]
+
+    def _news(self) -> httpx.Response:
+        results = [
+            # Mostly random text so near-duplicate filtering keeps every headline
+            {"title": f"Bench headline {self._word()} as {self._word()} traders eye {self._word()}",
+             "source": {"title": "BenchWire"}}
+            for _ in range(self.headlines)
+        ]
+        return httpx.Response(200, json={"results": results})
+
+    def _text_generation(self, request: httpx.Request) -> httpx.Response:
+        prompt = json.loads(request.content)["inputs"]
+        items = [int(n) for n in _BATCH_ITEM.findall(prompt)]
+        block = "NAME: BenchBrain\nTICKER: BNCH\nPHRASE: benchmarking the moon 📈"
+        if items:
+            text = "\n".join(f"[{n}]\n{block}" for n in items)
+        else:
+            text = block
+        return httpx.Response(200, json=[{"generated_text": text}])
+
+    def _text_to_image(self) -> httpx.Response:
+        return httpx.Response(200, content=self._image, headers={"content-type": "image/png"})
+
+    def _upload(self) -> httpx.Response:
+        url = f"https://img.bench/{uuid.uuid4().hex}.jpg"
+        return httpx.Response(200, json={"success": True, "data": {"url": url}})
+
+
+def _make_image(size: int = 512) -> bytes:
+    from PIL import Image
+
+    image = Image.new("RGB", (size, size), (40, 120, 200))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
@@ -0,0 +1,85 @@
+"""Event-loop latency while post-processing images, inline vs. in the executor.
+
+A ticker coroutine sleeps for 5ms in a loop and records how late each wake-up
+is. Meanwhile a batch of generated-size images is processed either directly on
+the event loop (``inline``) or through the image executor.
+
+    python -m benchmarks.image_executor --images 12 --workers 2
+"""
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import time
+from typing import List
+from app.config.settings import settings
+from app.services import image_processing
+
+
+def make_source_image(size: int = 1024) -> bytes:
+    from PIL import Image
+
+    image = Image.frombytes("RGBA", (size, size), os.urandom(size * size * 4))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def measure_lag(stop: asyncio.Event, lags: List[float], interval: float = 0.005) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - start - interval) * 1000)
+
+
+async def run(mode: str, source: bytes, images: int) -> dict:
+    settings.IMAGE_EXECUTOR = mode
+    if mode != "inline":
+        # Warm the pool so worker start-up isn't counted
+        await image_processing.run_image_task(image_processing.process_image, source)
+
+    lags: List[float] = []
+    stop = asyncio.Event()
+    ticker = asyncio.ensure_future(measure_lag(stop, lags))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        image_processing.run_image_task(image_processing.process_image, source)
+        for _ in range(images)
+    ))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await ticker
+    image_processing.shutdown_image_executor()
+
+    lags.sort()
+    return {
+        "mode": mode,
+        "total_s": elapsed,
+        "lag_p50_ms": statistics.median(lags) if lags else 0.0,
+        "lag_max_ms": lags[-1] if lags else 0.0,
+        "ticks": len(lags),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--size", type=int, default=1024)
+    args = parser.parse_args()
+
+    settings.IMAGE_EXECUTOR_WORKERS = args.workers
+    source = make_source_image(args.size)
+
+    print(f"{'mode':<8} {'total s':>8} {'lag p50 ms':>11} {'lag max ms':>11} {'ticks':>6}")
+    for mode in ("inline", "thread", "process"):
+        result = asyncio.run(run(mode, source, args.images))
+        print(f"{result['mode']:<8} {result['total_s']:>8.2f} {result['lag_p50_ms']:>11.2f} "
+              f"{result['lag_max_ms']:>11.2f} {result['ticks']:>6}")
+
+
+if __name__ == "__main__":
+    main()
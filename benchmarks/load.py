@@ -0,0 +1,146 @@
+"""Offline load test of /meme and /memes against local fakes.
+
+The news API, the text/image inference endpoints and the image host are
+served by ``benchmarks.fakes`` with configurable latency and failure rates,
+so this runs on any machine without credentials or network access.
+
+    python -m benchmarks.load --endpoint meme --concurrency 1 4 16 --requests 64
+    python -m benchmarks.load --endpoint memes --concurrency 1 2 --requests 8 --image-latency 1.0
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+from typing import List, Optional
+import httpx
+from benchmarks.fakes import FakeBackends, BackendProfile, INFERENCE_URL, NEWS_URL, UPLOAD_URL
+
+
+def configure(args: argparse.Namespace) -> None:
+    """Point settings at the fakes.
+
+    Settings are read when the ``app`` package is first imported, so this sets
+    environment variables and must run before anything from ``app`` is imported.
+    """
+    overrides = {
+        "NEWS_BASE_URL": NEWS_URL,
+        "AI_BASE_URL": INFERENCE_URL,
+        "AI_PROMPT_MODEL": "text-model",
+        "AI_IMAGE_MODEL": "image-model",
+        "UPLOAD_API_URL": UPLOAD_URL,
+        "INFERENCE_BACKEND": "async",
+        "IMAGE_STORAGE": "upload",
+        "UPLOAD_BACKOFF_BASE": "0.01",
+        "IMAGE_EXECUTOR": args.image_executor,
+        "MEME_BATCH_MODE": args.batch_mode,
+        "MEME_BATCH_RATE_PER_SECOND": "0",
+        "PRECOMPUTE_ENABLED": "false",
+        "REDIS_URL": "",
+    }
+    if not args.cache:
+        overrides.update({"MEME_CACHE_TTL": "0", "NEWS_CACHE_TTL": "0"})
+    os.environ.update(overrides)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def drive(app, endpoint: str, concurrency: int, requests: int) -> dict:
+    latencies: List[float] = []
+    statuses: dict = {}
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(None)
+
+    transport = httpx.ASGITransport(app=app, client=("127.0.0.1", 12345))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # Each worker is its own client, as admission control is fair per client
+        async def worker(index: int) -> None:
+            headers = {"X-Real-IP": f"10.0.{index // 250}.{index % 250 + 1}"}
+            while not queue.empty():
+                queue.get_nowait()
+                if endpoint == "meme":
+                    url = "/api/v1/meme"
+                    params = {"news": f"Bench story {uuid.uuid4().hex[:12]} shakes crypto"}
+                else:
+                    url, params = "/api/v1/memes", None
+                started = time.perf_counter()
+                response = await client.get(url, params=params, headers=headers)
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(index) for index in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "mean": statistics.mean(latencies) if latencies else 0.0,
+        "statuses": statuses,
+    }
+
+
+async def run(args: argparse.Namespace, backends: FakeBackends) -> List[dict]:
+    from app import create_app
+    from app.services import http_client
+
+    app = create_app()
+    results = []
+    async with app.router.lifespan_context(app):
+        # Swap the shared pool for one backed by the fakes
+        await http_client.close_http_client()
+        http_client._client = httpx.AsyncClient(transport=backends.transport(), follow_redirects=True)
+        for concurrency in args.concurrency:
+            results.append(await drive(app, args.endpoint, concurrency, args.requests))
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--endpoint", choices=["meme", "memes"], default="meme")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=32, help="requests per concurrency level")
+    parser.add_argument("--batch-mode", choices=["pipeline", "concurrent"], default="pipeline")
+    parser.add_argument("--image-executor", choices=["process", "thread", "inline"], default="thread")
+    parser.add_argument("--cache", action="store_true", help="keep news and meme caches enabled")
+    for name, profile in (("news", BackendProfile(0.05, 0.02)), ("text", BackendProfile(0.8, 0.3)),
+                          ("image", BackendProfile(2.0, 0.5)), ("upload", BackendProfile(0.3, 0.1))):
+        parser.add_argument(f"--{name}-latency", type=float, default=profile.latency)
+        parser.add_argument(f"--{name}-jitter", type=float, default=profile.jitter)
+        parser.add_argument(f"--{name}-failure-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    configure(args)
+    backends = FakeBackends(**{
+        name: BackendProfile(
+            getattr(args, f"{name}_latency"),
+            getattr(args, f"{name}_jitter"),
+            getattr(args, f"{name}_failure_rate")
+        )
+        for name in ("news", "text", "image", "upload")
+    })
+
+    results = asyncio.run(run(args, backends))
+
+    print(f"endpoint=/{args.endpoint} batch_mode={args.batch_mode} image_executor={args.image_executor}")
+    print(f"{'conc':>5} {'reqs':>5} {'req/s':>8} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8}  statuses")
+    for r in results:
+        print(f"{r['concurrency']:>5} {r['requests']:>5} {r['throughput']:>8.2f} {r['p50']:>8.3f} "
+              f"{r['p95']:>8.3f} {r['p99']:>8.3f}  {r['statuses']}")
+    print(f"backend calls: {backends.calls}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Requests per second on ``/api/v1/health`` through the full middleware stack.
+
+Requests are driven straight through the ASGI app, without a server or HTTP
+client, so the numbers are dominated by routing and middleware overhead. Runs
+against the same app with and without the middleware to show what it costs.
+
+    python -m benchmarks.middleware --requests 20000
+"""
+import argparse
+import asyncio
+import time
+from fastapi import FastAPI
+from app import create_app
+from app.api.routes import router
+
+HEALTH_PATH = "/api/v1/health"
+
+
+def bare_app() -> FastAPI:
+    app = FastAPI(docs_url=None, redoc_url=None)
+    app.include_router(router, prefix="/api/v1")
+    return app
+
+
+async def request(app, client_host: str) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": HEALTH_PATH,
+        "raw_path": HEALTH_PATH.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"localhost"), (b"accept", b"*/*")],
+        "client": (client_host, 50000),
+        "server": ("localhost", 8000),
+    }
+    status = 0
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            # Like a server whose client is still connected: nothing more to read
+            await asyncio.Event().wait()
+        received = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def run(name: str, app, requests: int, concurrency: int, client_host: str) -> dict:
+    # Warm up routing and any lazily built state
+    for _ in range(100):
+        assert await request(app, client_host) == 200
+
+    async def worker(count: int) -> None:
+        for _ in range(count):
+            await request(app, client_host)
+
+    start = time.perf_counter()
+    per_worker = requests // concurrency
+    await asyncio.gather(*(worker(per_worker) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    total = per_worker * concurrency
+    return {"stack": name, "requests": total, "req_per_s": total / elapsed, "us_per_req": elapsed / total * 1e6}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--client", default="172.18.0.5", help="client address, must be on the allow-list")
+    args = parser.parse_args()
+
+    print(f"{'stack':>14} {'requests':>9} {'req/s':>10} {'us/req':>8}")
+    for name, app in (("no middleware", bare_app()), ("full stack", create_app())):
+        result = await run(name, app, args.requests, args.concurrency, args.client)
+        print(f"{result['stack']:>14} {result['requests']:>9} {result['req_per_s']:>10.0f} {result['us_per_req']:>8.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""Cold start: importing and creating the app, lifespan startup and the first requests.
+
+Each run is a fresh interpreter, so nothing is cached between runs. The
+backends are the zero-latency fakes from ``benchmarks.fakes``, so request
+times are the app's own one-off costs (imports, pools, worker processes)
+rather than network time. Reports the median over ``--runs``.
+
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --runs 5 --image-executor thread
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+
+def child() -> None:
+    started = time.perf_counter()
+    from app import create_app
+    application = create_app()
+    created = time.perf_counter()
+
+    import asyncio
+    import httpx
+    from benchmarks.fakes import BackendProfile, FakeBackends
+    from app.services import http_client
+
+    async def measure() -> Dict[str, float]:
+        result = {"create_app": created - started}
+        begin = time.perf_counter()
+        async with application.router.lifespan_context(application):
+            result["startup"] = time.perf_counter() - begin
+            for name, seconds in getattr(application.state, "startup_timings", {}).items():
+                result[f"  {name}"] = seconds
+
+            await http_client.close_http_client()
+            backends = FakeBackends(**{name: BackendProfile() for name in ("news", "text", "image", "upload")})
+            http_client._client = httpx.AsyncClient(transport=backends.transport(), follow_redirects=True)
+            transport = httpx.ASGITransport(app=application, client=("127.0.0.1", 12345))
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                for name, news in (("first /meme", "Bitcoin tops 100k"), ("second /meme", "Ether ETF approved")):
+                    begin = time.perf_counter()
+                    response = await client.get("/api/v1/meme", params={"news": news})
+                    assert response.status_code == 200, response.text
+                    result[name] = time.perf_counter() - begin
+        return result
+
+    print(json.dumps(asyncio.run(measure())))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--image-executor", choices=["process", "thread", "inline"], default="process")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+
+    from benchmarks.load import configure
+
+    configure(argparse.Namespace(image_executor=args.image_executor, batch_mode="pipeline", cache=False))
+    runs: List[Dict[str, float]] = []
+    for _ in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.startup", "--child"],
+            check=True, capture_output=True, text=True
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"image_executor={args.image_executor} runs={args.runs}")
+    print(f"{'phase':>16} {'median ms':>10} {'min ms':>8} {'max ms':>8}")
+    for name in runs[0]:
+        values = [run[name] * 1000 for run in runs]
+        print(f"{name:>16} {statistics.median(values):>10.1f} {min(values):>8.1f} {max(values):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import json
+import time
 import pytest
 from unittest.mock import patch, MagicMock
 from fastapi import HTTPException
@@ -54,6 +56,94 @@ async def test_generate_memes_no_news(client):
         response = client.get("/api/v1/memes")
         assert response.status_code == 404
 
+def test_stream_memes(client, mock_news_response, mock_meme_response):
+    """Test the streaming meme endpoint emits memes and per-item errors."""
+    from app.models.schemas import MemeItemResult, MemeResponse
+
+    async def fake_iter(self, news_list, concurrency=None):
+        yield 1, MemeItemResult(news=news_list[1], status="failed", error="Failed to generate image")
+        yield 0, MemeItemResult(news=news_list[0], status="ok", meme=MemeResponse(**mock_meme_response[0]))
+
+    with patch('app.services.news_service.NewsService.fetch_news',
+               return_value=mock_news_response), \
+         patch('app.services.news_to_ai_service.NewsToAIService.iter_news_batch', fake_iter):
+        response = client.get("/api/v1/memes/stream")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        events = [json.loads(line) for line in response.text.splitlines()]
+        assert events[0] == {"event": "error", "index": 1,
+                             "news": "Ethereum 2.0 Launch Successful",
+                             "detail": "Failed to generate image"}
+        assert events[1]["event"] == "meme"
+        assert events[1]["data"]["ticker"] == "LAMBO"
+
+def test_meme_job_lifecycle(client, mock_meme_response):
+    """Test queueing a meme job, polling it and fetching the result."""
+    from app.models.schemas import MemeResponse
+
+    with patch('app.services.news_to_ai_service.NewsToAIService.generate_meme',
+               return_value=MemeResponse(**mock_meme_response[0])), client:
+        response = client.post("/api/v1/jobs", json={"news": "Bitcoin Reaches New All-Time High"})
+        assert response.status_code == 202
+        job_id = response.json()["id"]
+
+        for _ in range(50):
+            job = client.get(f"/api/v1/jobs/{job_id}").json()
+            if job["status"] == "succeeded":
+                break
+            time.sleep(0.01)
+        assert job["status"] == "succeeded"
+
+        response = client.get(f"/api/v1/jobs/{job_id}/result")
+        assert response.status_code == 200
+        assert response.json()["ticker"] == "LAMBO"
+
+def test_meme_job_not_found(client):
+    """Test polling an unknown job."""
+    response = client.get("/api/v1/jobs/unknown")
+    assert response.status_code == 404
+
+def test_get_image_from_store(client, tmp_path, monkeypatch):
+    """Test serving a stored image with cache validators."""
+    import asyncio
+    from app.services import image_store
+
+    store = image_store.LocalImageStore(str(tmp_path))
+    monkeypatch.setattr(image_store, "_store", store)
+    key = asyncio.run(store.put(b"jpeg-bytes"))
+
+    response = client.get(f"/api/v1/images/{key}.jpg")
+    assert response.status_code == 200
+    assert response.content == b"jpeg-bytes"
+    assert response.headers["etag"] == f'"{key}"'
+    assert "immutable" in response.headers["cache-control"]
+
+    response = client.get(f"/api/v1/images/{key}.jpg", headers={"If-None-Match": f'"{key}"'})
+    assert response.status_code == 304
+
+    assert client.get(f"/api/v1/images/{'0' * 64}.jpg").status_code == 404
+
+def test_generate_memes_batch_reports_partial(client, mock_news_response, mock_meme_response):
+    """Test the detailed batch endpoint keeps successes when an item fails."""
+    from app.models.schemas import MemeItemResult, MemeResponse
+
+    items = [
+        MemeItemResult(news="Bitcoin Reaches New All-Time High", status="ok",
+                       meme=MemeResponse(**mock_meme_response[0]), timings={"text": 1.0}),
+        MemeItemResult(news="Ethereum 2.0 Launch Successful", status="failed",
+                       error="Failed to generate image"),
+    ]
+    with patch('app.services.news_service.NewsService.fetch_news',
+               return_value=mock_news_response), \
+         patch('app.services.news_to_ai_service.NewsToAIService.process_news_batch_detailed',
+               return_value=items):
+        response = client.get("/api/v1/memes/batch")
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["total"], data["succeeded"], data["failed"], data["partial"]) == (2, 1, 1, True)
+        assert data["items"][0]["meme"]["ticker"] == "LAMBO"
+        assert data["items"][1]["error"] == "Failed to generate image"
+
 def test_cors_middleware(client):
     """Test CORS middleware configuration."""
     response = client.options(
@@ -74,6 +164,24 @@ def test_timing_middleware(client):
     assert "x-process-time" in response.headers
     assert float(response.headers["x-process-time"]) >= 0
 
+def test_server_timing_and_metrics(client):
+    """Test that stage spans reach the Server-Timing header and /metrics."""
+    from app.services.metrics import span
+
+    async def fake_fetch(self):
+        with span("news_fetch"):
+            return [{"title": "Bitcoin Reaches New All-Time High", "source": "CryptoNews"}]
+
+    with patch('app.services.news_service.NewsService.fetch_news', fake_fetch):
+        response = client.get("/api/v1/news")
+    assert response.status_code == 200
+    assert "news_fetch;dur=" in response.headers["server-timing"]
+    assert "total;dur=" in response.headers["server-timing"]
+
+    metrics = client.get("/api/v1/metrics").text
+    assert 'meme_stage_duration_seconds_count{stage="news_fetch"}' in metrics
+    assert 'http_requests_total{method="GET",route="/api/v1/news",status="200"}' in metrics
+
 def test_internal_only_middleware_localhost(client):
     """Test internal only middleware with localhost."""
     response = client.get("/api/v1/health")
@@ -90,4 +198,66 @@ def test_internal_only_middleware_external(client):
         with pytest.raises(HTTPException) as exc_info:
             client.get("/api/v1/health")
         assert exc_info.value.status_code == 403
-        assert exc_info.value.detail == "Access denied"
\ No newline at end of file
+        assert exc_info.value.detail == "Access denied"
+
+def test_ip_allow_list_matches_merged_intervals():
+    """Test allow-list lookups at network edges, IPv4-mapped and invalid hosts."""
+    import ipaddress
+    from app.api.middleware import DEFAULT_ALLOWED_NETWORKS, IPAllowList
+
+    allow_list = IPAllowList(DEFAULT_ALLOWED_NETWORKS)
+    assert allow_list.decide("127.0.0.1")
+    assert allow_list.decide("172.17.0.0") and allow_list.decide("172.19.255.255")
+    assert not allow_list.decide("172.20.0.0")
+    assert allow_list.decide("10.116.15.255") and not allow_list.decide("10.116.16.0")
+    assert allow_list.decide("::ffff:127.0.0.1")
+    assert not allow_list.decide("8.8.8.8")
+    assert allow_list.decide("not-an-ip") is None
+
+    assert IPAllowList([ipaddress.ip_network("fd00::/8")]).decide("fd12::1")
+
+@pytest.mark.asyncio
+async def test_generation_is_cancelled_on_client_disconnect():
+    """Test that a disconnected client's work is cancelled and reported as 499."""
+    import asyncio
+    from starlette.requests import Request
+    from app.api.routes import run_until_disconnect
+
+    async def receive():
+        await asyncio.sleep(0.01)
+        return {"type": "http.disconnect"}
+
+    request = Request({"type": "http", "method": "GET", "headers": []}, receive)
+    work = asyncio.ensure_future(asyncio.sleep(10))
+
+    with pytest.raises(HTTPException) as exc_info:
+        await run_until_disconnect(request, work)
+    assert exc_info.value.status_code == 499
+    await asyncio.sleep(0)
+    assert work.cancelled()
+
+def test_generation_rejected_with_retry_after_when_saturated(client):
+    """Test that a saturated admission controller answers 503 with Retry-After."""
+    from app.api.dependencies import services_for
+    from app.services.admission import AdmissionController
+
+    admission = services_for(client.app).admission = AdmissionController(max_active=1, max_queue=0)
+    admission.active = 1
+    response = client.get("/api/v1/meme", params={"news": "Bitcoin hits ATH"})
+
+    assert response.status_code == 503
+    assert int(response.headers["retry-after"]) >= 1
+
+def test_lifespan_builds_services_and_records_warmup(app):
+    """Test that startup builds services once and times each warm-up phase."""
+    from fastapi.testclient import TestClient
+    from app.config.settings import settings
+
+    with patch.object(settings, "IMAGE_EXECUTOR", "thread"):
+        with TestClient(app) as client:
+            services = app.state.services
+            assert set(app.state.startup_timings) == {"services", "http_client", "image_executor"}
+            assert client.get("/api/v1/admission/stats").status_code == 200
+            assert app.state.services is services
+            metrics = client.get("/api/v1/metrics").text
+    assert 'startup_phase_seconds{phase="image_executor"}' in metrics
@@ -0,0 +1,904 @@
+import asyncio
+import time
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services import http_client
+from app.services.admission import AdmissionController, AdmissionRejected
+from app.services.cache import TTLCache
+from app.services import image_processing
+from app.services.inference import AsyncInferenceBackend, SyncInferenceBackend
+from app.services.jobs import InMemoryJobStore, JobManager
+from app.services.meme_cache import MemeCache
+from app.services.meme_parser import parse_meme_info
+from app.services.news_service import NewsService
+from app.services.news_sources import NewsApiSource, RssSource
+from app.config.settings import settings as service_settings
+from app.models.schemas import MemeItemResult, MemeResponse
+from app.services.news_to_ai_service import NewsToAIService
+from app.services.pipeline import Stage, run_pipeline
+from app.services.precompute import MemePrecomputer
+from app.services.prompts import PROMPTS, PromptTemplate
+from app.services.rate_limit import TokenBucket
+from app.services.resilience import AdaptiveLimiter, CircuitBreaker, CircuitOpenError
+
+def make_meme(news):
+    return MemeResponse(
+        news=news,
+        meme="MoonLambo (LAMBO) riding the green candles 🚀",
+        ticker="LAMBO",
+        name="MoonLambo",
+        image="https://example.com/image.jpg",
+        timestamp="2024-12-26 10:00:00"
+    )
+
+def make_item(news):
+    return MemeItemResult(news=news, status="ok", meme=make_meme(news))
+
+@pytest.mark.asyncio
+async def test_process_news_batch_keeps_order_and_skips_failures():
+    """Test that batch results keep input order and survive item failures."""
+    service = NewsToAIService()
+    service.rate_limiter = TokenBucket(rate=0)
+    service.batch_mode = "concurrent"
+
+    async def fake_generate(news):
+        await asyncio.sleep(0.03 if news == "first" else 0.01)
+        if news == "broken":
+            return MemeItemResult(news=news, status="failed", error="Failed to generate image")
+        return make_item(news)
+
+    with patch.object(service, '_generate_item', side_effect=fake_generate):
+        memes = await service.process_news_batch(["first", "broken", "third"], concurrency=3)
+
+    assert [meme.news for meme in memes] == ["first", "third"]
+
+@pytest.mark.asyncio
+async def test_process_news_batch_respects_concurrency():
+    """Test that no more than the configured number of items run at once."""
+    service = NewsToAIService()
+    service.rate_limiter = TokenBucket(rate=0)
+    service.batch_mode = "concurrent"
+    running = peak = 0
+
+    async def fake_generate(news):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return make_item(news)
+
+    with patch.object(service, '_generate_item', side_effect=fake_generate):
+        memes = await service.process_news_batch([str(i) for i in range(6)], concurrency=2)
+
+    assert len(memes) == 6
+    assert peak == 2
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate():
+    """Test that the token bucket spaces acquisitions after the burst."""
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.monotonic()
+    for _ in range(3):
+        await bucket.acquire()
+    assert time.monotonic() - start >= 0.035
+
+@pytest.mark.asyncio
+async def test_run_pipeline_overlaps_stages_and_isolates_failures():
+    """Test that stages overlap, results keep order and failures stay per item."""
+    active = set()
+    overlapped = False
+
+    def stage(name, fail_on=None):
+        async def handler(value):
+            nonlocal overlapped
+            active.add(name)
+            overlapped = overlapped or len(active) > 1
+            await asyncio.sleep(0.01)
+            active.discard(name)
+            if value == fail_on:
+                raise ValueError(value)
+            return value
+        return handler
+
+    results = await run_pipeline(
+        [1, 2, 3, 4],
+        [Stage("a", stage("a")), Stage("b", stage("b", fail_on=2)), Stage("c", stage("c"))],
+        queue_size=1
+    )
+
+    assert results[0] == 1 and results[2] == 3 and results[3] == 4
+    assert isinstance(results[1], ValueError)
+    assert overlapped
+
+@pytest.mark.asyncio
+async def test_process_news_batch_pipeline_mode():
+    """Test that pipeline mode runs each stage and drops failed items."""
+    service = NewsToAIService()
+    service.rate_limiter = TokenBucket(rate=0)
+    service.batch_mode = "pipeline"
+    service.text_batch_size = 1
+
+    async def fake_info(news):
+        return {"name": f"Name{news}", "ticker": "TICK", "phrase": "hodl 🚀"}
+
+    async def fake_image(news, name):
+        return None if news == "bad" else {"image": b"image"}
+
+    async def fake_upload(image_bytes):
+        return "https://example.com/image.jpg"
+
+    with patch.object(service, '_generate_meme_info', side_effect=fake_info), \
+         patch.object(service, '_generate_meme_image', side_effect=fake_image), \
+         patch.object(service, '_upload_to_image', side_effect=fake_upload):
+        memes = await service.process_news_batch(["one", "bad", "two"])
+
+    assert [meme.name for meme in memes] == ["Nameone", "Nametwo"]
+
+@pytest.mark.asyncio
+async def test_http_client_is_shared_until_closed():
+    """Test that services share one pooled client and shutdown releases it."""
+    client = http_client.get_http_client()
+    assert http_client.get_http_client() is client
+
+    await http_client.close_http_client()
+    assert client.is_closed
+    assert http_client.get_http_client() is not client
+    await http_client.close_http_client()
+
+@pytest.mark.asyncio
+async def test_upload_uses_shared_client(monkeypatch):
+    """Test that image upload goes through the shared HTTP client."""
+    def handler(request):
+        assert b'name="image"; filename="meme.jpg"' in request.content
+        assert b"jpeg-bytes" in request.content
+        return httpx.Response(200, json={"success": True, "data": {"url": "https://example.com/a.jpg"}})
+
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    service = NewsToAIService()
+    service.upload_api_url = "https://upload.example.com"
+
+    assert await service._upload_to_image(b"jpeg-bytes") == "https://example.com/a.jpg"
+    await http_client.close_http_client()
+
+@pytest.mark.asyncio
+async def test_ttl_cache_coalesces_concurrent_misses():
+    """Test that concurrent misses for one key trigger a single fetch."""
+    cache = TTLCache(ttl=60)
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return ["headline"]
+
+    results = await asyncio.gather(*(cache.get_or_fetch("news", fetch) for _ in range(5)))
+    assert results == [["headline"]] * 5
+    assert calls == 1
+
+@pytest.mark.asyncio
+async def test_ttl_cache_serves_stale_while_revalidating():
+    """Test that an expired entry is served while one refresh runs."""
+    cache = TTLCache(ttl=0.01, stale_ttl=60)
+    values = iter(["old", "new"])
+
+    async def fetch():
+        return next(values)
+
+    assert await cache.get_or_fetch("news", fetch) == "old"
+    await asyncio.sleep(0.02)
+    assert await cache.get_or_fetch("news", fetch) == "old"
+    await asyncio.sleep(0)
+    assert await cache.get_or_fetch("news", fetch) == "new"
+
+@pytest.mark.asyncio
+async def test_meme_cache_local_fallback_counts_hits():
+    """Test that the local LRU caches by normalized news and counts lookups."""
+    cache = MemeCache(redis_url="", ttl=60, max_entries=1)
+
+    assert await cache.get("Bitcoin  hits ATH") is None
+    await cache.set("Bitcoin  hits ATH", make_meme("Bitcoin  hits ATH"))
+    assert (await cache.get(" bitcoin hits ath ")).ticker == "LAMBO"
+
+    await cache.set("Other news", make_meme("Other news"))
+    assert await cache.get("Bitcoin hits ATH") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+@pytest.mark.asyncio
+async def test_meme_cache_falls_back_when_redis_is_down():
+    """Test that an unreachable Redis falls back to the local cache."""
+    cache = MemeCache(redis_url="redis://127.0.0.1:1/0", ttl=60)
+    await cache.set("news", make_meme("news"))
+
+    assert (await cache.get("news")).name == "MoonLambo"
+    assert cache.stats()["backend"] == "local"
+    await cache.close()
+
+@pytest.mark.asyncio
+async def test_generate_meme_uses_result_cache():
+    """Test that a repeated headline skips regeneration."""
+    service = NewsToAIService()
+    service.meme_cache = MemeCache(redis_url="", ttl=60)
+
+    with patch.object(service, '_generate_item', side_effect=make_item) as generate:
+        await service.generate_meme("Bitcoin hits ATH")
+        meme = await service.generate_meme("bitcoin hits ATH")
+
+    assert generate.call_count == 1
+    assert meme.news == "bitcoin hits ATH"
+
+@pytest.mark.asyncio
+async def test_generate_meme_coalesces_concurrent_callers():
+    """Test that concurrent callers share one generation and survive a cancel."""
+    service = NewsToAIService()
+    service.meme_cache = MemeCache(redis_url="", ttl=0)
+    calls = 0
+
+    async def slow_generate(news):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.03)
+        return make_item(news)
+
+    with patch.object(service, '_generate_item', side_effect=slow_generate):
+        first = asyncio.ensure_future(service.generate_meme("Bitcoin hits ATH"))
+        second = asyncio.ensure_future(service.generate_meme("bitcoin  hits ATH"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        batch = await service.process_news_batch(["BITCOIN HITS ATH"])
+        meme = await second
+
+    assert calls == 1
+    assert meme.news == "bitcoin  hits ATH"
+    assert batch[0].news == "BITCOIN HITS ATH"
+    assert len(service.inflight) == 0
+
+@pytest.mark.asyncio
+async def test_finished_batch_item_is_cached_before_batch_ends():
+    """Test that an item done early in a batch is served from cache, not regenerated."""
+    service = NewsToAIService()
+    service.meme_cache = MemeCache(redis_url="", ttl=60)
+    service.batch_mode = "concurrent"
+    service.rate_limiter = TokenBucket(rate=0)
+    calls = []
+
+    async def fake_generate(news):
+        calls.append(news)
+        await asyncio.sleep(0.2 if news == "slow" else 0)
+        return make_item(news)
+
+    with patch.object(service, '_generate_item', side_effect=fake_generate):
+        flights = await service._start_batch(["fast", "slow"])
+        await service.inflight.join(flights[0])
+        meme = await service.generate_meme("fast")
+        await service.inflight.join(flights[1])
+
+    assert meme.news == "fast"
+    assert calls == ["fast", "slow"]
+
+@pytest.mark.asyncio
+async def test_singleflight_does_not_join_work_being_cancelled():
+    """Test that a caller arriving while abandoned work winds down starts it afresh."""
+    from app.services.singleflight import SingleFlight
+
+    flights = SingleFlight()
+    started = []
+
+    async def work():
+        started.append(True)
+        try:
+            await asyncio.sleep(10)
+        finally:
+            # Cleanup that awaits keeps the cancelled task alive for a while
+            await asyncio.sleep(0.02)
+        return "stale"
+
+    first = asyncio.ensure_future(flights.do("key", work))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+
+    async def fresh():
+        return "fresh"
+
+    assert await flights.do("key", fresh) == "fresh"
+    assert len(started) == 1
+
+@pytest.mark.asyncio
+async def test_precomputer_warms_cache_for_new_headlines(mock_news_response):
+    """Test that precomputed memes are served from cache by later batches."""
+    service = NewsToAIService()
+    service.meme_cache = MemeCache(redis_url="", ttl=60)
+    service.batch_mode = "concurrent"
+    service.rate_limiter = TokenBucket(rate=0)
+    news_service = MagicMock()
+    news_service.fetch_news = AsyncMock(return_value=mock_news_response)
+    precomputer = MemePrecomputer(news_service, service, interval=60)
+
+    with patch.object(service, '_generate_item', side_effect=make_item) as generate:
+        assert await precomputer.run_once() == 2
+        assert await precomputer.run_once() == 0
+        memes = await service.process_news_batch([news['title'] for news in mock_news_response])
+
+    assert generate.call_count == 2
+    assert len(memes) == 2
+
+@pytest.mark.asyncio
+async def test_iter_news_batch_yields_in_completion_order():
+    """Test that streamed items arrive as they finish, errors included."""
+    service = NewsToAIService()
+    service.meme_cache = MemeCache(redis_url="", ttl=0)
+    service.batch_mode = "concurrent"
+    service.rate_limiter = TokenBucket(rate=0)
+
+    async def fake_generate(news):
+        await asyncio.sleep({"slow": 0.03, "fast": 0.0, "broken": 0.01}[news])
+        if news == "broken":
+            return MemeItemResult(news=news, status="failed", error="Failed to upload image")
+        return make_item(news)
+
+    with patch.object(service, '_generate_item', side_effect=fake_generate):
+        items = [item async for item in service.iter_news_batch(["slow", "fast", "broken"])]
+
+    assert [(index, result.news) for index, result in items] == [(1, "fast"), (2, "broken"), (0, "slow")]
+    assert items[1][1].status == "failed"
+
+@pytest.mark.asyncio
+async def test_job_manager_records_failures():
+    """Test that a failing job ends up failed with its error in the store."""
+    service = MagicMock()
+    service.generate_meme = AsyncMock(side_effect=Exception("Failed to generate image"))
+    manager = JobManager(service, store=InMemoryJobStore(ttl=60), workers=1)
+
+    job = await manager.submit("Bitcoin hits ATH")
+    assert job.status == "queued"
+    await manager._queue.join()
+
+    job = await manager.get(job.id)
+    assert job.status == "failed"
+    assert job.error == "Failed to generate image"
+    await manager.stop()
+
+@pytest.mark.asyncio
+async def test_job_manager_sheds_submissions_when_queue_is_full():
+    """Test that a full job queue rejects new jobs with 503 and Retry-After."""
+    service = MagicMock()
+    service.generate_meme = AsyncMock(return_value=None)
+    manager = JobManager(service, store=InMemoryJobStore(ttl=60), workers=1, max_queue=1)
+
+    await manager.submit("Bitcoin hits ATH")
+    with pytest.raises(AdmissionRejected) as exc_info:
+        await manager.submit("Ether hits ATH")
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.retry_after >= 1
+
+    await manager._queue.join()
+    assert (await manager.submit("Ether hits ATH")).status == "queued"
+    await manager.stop()
+
+@pytest.mark.asyncio
+async def test_job_worker_survives_cancelled_generation():
+    """Test that a generation cancelled by others fails the job but keeps the worker."""
+    service = MagicMock()
+    service.generate_meme = AsyncMock(side_effect=[asyncio.CancelledError(), Exception("boom")])
+    manager = JobManager(service, store=InMemoryJobStore(ttl=60), workers=1)
+
+    first = await manager.submit("Bitcoin hits ATH")
+    second = await manager.submit("Ether hits ATH")
+    await asyncio.wait_for(manager._queue.join(), 1)
+
+    assert (await manager.get(first.id)).status == "failed"
+    assert (await manager.get(second.id)).error == "boom"
+    await manager.stop()
+
+@pytest.mark.asyncio
+async def test_image_task_resizes_and_encodes_off_loop(monkeypatch):
+    """Test that image post-processing returns a resized RGB JPEG."""
+    import io
+    from PIL import Image
+
+    source = io.BytesIO()
+    Image.new("RGBA", (64, 32), (255, 0, 0, 128)).save(source, format="PNG")
+    monkeypatch.setattr(image_processing.settings, "IMAGE_EXECUTOR", "thread")
+
+    data = await image_processing.run_image_task(
+        image_processing.process_image, source.getvalue(), (500, 500), 85
+    )
+    image_processing.shutdown_image_executor()
+
+    image = Image.open(io.BytesIO(data))
+    assert image.format == "JPEG"
+    assert image.size == (500, 500)
+    assert image.mode == "RGB"
+
+@pytest.mark.asyncio
+async def test_async_inference_backend_uses_shared_client(monkeypatch):
+    """Test that the async backend posts to the model endpoint over the shared pool."""
+    def handler(request):
+        assert request.url == "https://models.example.com/text-model"
+        assert request.headers["authorization"] == "Bearer token"
+        return httpx.Response(200, json=[{"generated_text": "NAME: MoonBrain"}])
+
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    backend = AsyncInferenceBackend("text-model", "image-model", "token", "https://models.example.com/")
+
+    assert await backend.text_generation("prompt", timeout=5, max_new_tokens=150) == "NAME: MoonBrain"
+    await http_client.close_http_client()
+
+@pytest.mark.asyncio
+async def test_sync_inference_backend_times_out():
+    """Test that the sync fallback enforces the per-call timeout."""
+    text_client = MagicMock()
+    text_client.text_generation.side_effect = lambda prompt, **kwargs: time.sleep(0.2)
+    backend = SyncInferenceBackend(text_client, MagicMock(), workers=1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await backend.text_generation("prompt", timeout=0.01)
+
+@pytest.mark.asyncio
+async def test_batched_meme_info_retries_unparsed_items_singly():
+    """Test that one LLM call covers the batch and bad items are retried while others move on."""
+    service = NewsToAIService()
+    service.meme_cache = MemeCache(redis_url="", ttl=0)
+    service.rate_limiter = TokenBucket(rate=0)
+    service.batch_mode = "pipeline"
+    service.text_batch_size = 6
+    response = """[1]
+NAME: MoonBrain
+TICKER: smart
+PHRASE: galaxy brain moves 🧠
+[2]
+NAME: X
+[3]
+NAME: DumpsterDive
+TICKER: OUCH
+PHRASE: catching knives 📈"""
+    events = []
+
+    async def retry(news):
+        events.append(f"retry {news}")
+        await asyncio.sleep(0.05)
+        return {"name": "Retried", "ticker": "RTRY", "phrase": "again 🚀"}
+
+    async def fake_image(news, name):
+        events.append(f"image {news}")
+        return {"image": b"image"}
+
+    with patch.object(service.inference, 'text_generation', AsyncMock(return_value=response)) as generate, \
+         patch.object(service, '_generate_meme_info', side_effect=retry) as generate_single, \
+         patch.object(service, '_generate_meme_image', side_effect=fake_image), \
+         patch.object(service, '_upload_to_image', AsyncMock(return_value="https://example.com/image.jpg")):
+        memes = await service.process_news_batch(["one", "two", "three"])
+
+    assert generate.call_count == 1
+    generate_single.assert_awaited_once_with("two")
+    # Parsed items reach the image stage without waiting for the retry
+    assert events.index("image one") < events.index("image two")
+    assert events.index("image three") < events.index("image two")
+    assert [meme.name for meme in memes] == ["MoonBrain", "Retried", "DumpsterDive"]
+    assert memes[0].meme == "MoonBrain (SMART) galaxy brain moves 🧠 🚀"
+
+def test_split_batch_items_accepts_common_marker_forms():
+    """Test inline, markdown-wrapped and numbered item markers, and numbered fields."""
+    from app.services.meme_parser import split_batch_items
+
+    response = """[1] NAME: MoonBrain
+TICKER: SMART
+PHRASE: galaxy brain 🧠
+**[2]**
+NAME: DumpsterDive
+TICKER: OUCH
+PHRASE: catching knives 📈
+### 3. NAME: Lambo
+TICKER: LAMBO
+PHRASE: vroom 🚀"""
+    items = {index: parse_meme_info(text) for index, text in split_batch_items(response).items()}
+    assert [items[i]["name"] for i in (1, 2, 3)] == ["MoonBrain", "DumpsterDive", "Lambo"]
+    assert items[3]["ticker"] == "LAMBO"
+
+    numbered = """1.
+1. Name: MoonBrain
+2. Ticker: SMART
+3. Phrase: galaxy brain 🧠
+2)
+1. Name: DumpsterDive
+2. Ticker: OUCH
+3. Phrase: catching knives 📈"""
+    items = {index: parse_meme_info(text) for index, text in split_batch_items(numbered).items()}
+    assert set(items) == {1, 2}
+    assert (items[1]["ticker"], items[2]["name"], items[2]["phrase"]) == ("SMART", "DumpsterDive", "catching knives 📈")
+
+def test_parse_meme_info_tolerates_json_and_markdown():
+    """Test that JSON and loosely formatted line responses both parse."""
+    assert parse_meme_info('Sure! {"Name": "MoonBrain", "ticker": "$smart", "phrase": "big brain 🧠"}') == {
+        "name": "MoonBrain", "ticker": "SMART", "phrase": "big brain 🧠"
+    }
+    assert parse_meme_info("**Name:** DumpsterDive\n- Ticker - OUCH\n2. phrase: \"falling knives 🔪\"") == {
+        "name": "DumpsterDive", "ticker": "OUCH", "phrase": "falling knives 🔪"
+    }
+
+@pytest.mark.asyncio
+async def test_generate_meme_info_retries_then_falls_back():
+    """Test the retry budget, the fallback and the parse counters."""
+    service = NewsToAIService()
+    responses = AsyncMock(side_effect=["NAME: MoonBrain", "TICKER: BRAIN"])
+
+    with patch.object(service.inference, 'text_generation', responses), \
+         patch.object(service_settings, 'MEME_INFO_MAX_RETRIES', 1):
+        info = await service._generate_meme_info("Bitcoin hits ATH")
+
+    assert info == {"name": "MoonBrain", "ticker": "BRAIN", "phrase": "to the moon! 🚀"}
+    assert "EXAMPLES" not in responses.call_args_list[1].args[0]
+    stats = service.parse_stats.as_dict()
+    assert (stats["attempts"], stats["parse_failures"], stats["retries"], stats["fallbacks"]) == (2, 2, 1, 1)
+
+@pytest.mark.asyncio
+async def test_generate_meme_info_call_failure_falls_back():
+    """Test that a failed inference call falls back instead of raising."""
+    service = NewsToAIService()
+
+    with patch.object(service.inference, 'text_generation', AsyncMock(side_effect=Exception("503"))):
+        info = await service._generate_meme_info("Bitcoin hits ATH")
+
+    assert info["name"] == "CryptoMeme"
+    assert service.parse_stats.call_failures == 1
+
+@pytest.mark.asyncio
+async def test_local_image_storage_skips_upload(tmp_path, monkeypatch):
+    """Test that local storage dedupes by content and skips the upload."""
+    from app.services import image_store
+
+    monkeypatch.setattr(image_store, "_store", image_store.LocalImageStore(str(tmp_path)))
+    monkeypatch.setattr(service_settings, "IMAGE_STORAGE", "local")
+    monkeypatch.setattr(service_settings, "IMAGE_PUBLIC_BASE_URL", "https://memes.example.com")
+    service = NewsToAIService()
+
+    with patch.object(service, '_upload_to_image', AsyncMock()) as upload:
+        first = await service._store_image(b"jpeg-bytes")
+        second = await service._store_image(b"jpeg-bytes")
+
+    upload.assert_not_called()
+    assert first == second
+    assert first == f"https://memes.example.com/api/v1/images/{image_store.ImageStore.key_for(b'jpeg-bytes')}.jpg"
+
+@pytest.mark.asyncio
+async def test_local_image_storage_without_public_url_uploads(monkeypatch):
+    """Test that local storage falls back to upload when its images can't be reached."""
+    monkeypatch.setattr(service_settings, "IMAGE_STORAGE", "local")
+    service = NewsToAIService()
+
+    with patch.object(service, '_upload_to_image', AsyncMock(return_value="https://i.example.com/a.jpg")) as upload:
+        assert await service._store_image(b"jpeg-bytes") == "https://i.example.com/a.jpg"
+
+    assert service.image_storage == "upload"
+    upload.assert_awaited_once_with(b"jpeg-bytes")
+
+@pytest.mark.asyncio
+async def test_upload_retries_transient_failures_with_same_bytes(monkeypatch):
+    """Test that 5xx and transport errors are retried without regenerating."""
+    outcomes = iter(["error", 503, 200])
+    bodies = []
+
+    def handler(request):
+        bodies.append(request.content)
+        outcome = next(outcomes)
+        if outcome == "error":
+            raise httpx.ConnectError("connection reset")
+        if outcome == 503:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"success": True, "data": {"url": "https://example.com/a.jpg"}})
+
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(service_settings, "UPLOAD_BACKOFF_BASE", 0.001)
+    service = NewsToAIService()
+    service.upload_api_url = "https://upload.example.com"
+
+    assert await service._upload_to_image(b"jpeg-bytes") == "https://example.com/a.jpg"
+    assert len(bodies) == 3
+    await http_client.close_http_client()
+
+@pytest.mark.asyncio
+async def test_batch_reports_partial_results_with_fallbacks(monkeypatch):
+    """Test per-item statuses, timings and the placeholder image fallback."""
+    monkeypatch.setattr(service_settings, "MEME_FALLBACK", "placeholder")
+    monkeypatch.setattr(service_settings, "MEME_PLACEHOLDER_IMAGE_URL", "https://example.com/placeholder.jpg")
+    service = NewsToAIService()
+    service.meme_cache = MemeCache(redis_url="", ttl=60)
+    service.rate_limiter = TokenBucket(rate=0)
+    service.text_batch_size = 1
+
+    async def fake_info(news):
+        if news == "text fails":
+            raise Exception("model overloaded")
+        return {"name": "MoonBrain", "ticker": "SMART", "phrase": "hodl 🚀"}
+
+    async def fake_image(news, name):
+        return None if news == "no image" else {"image": b"image"}
+
+    with patch.object(service, '_generate_meme_info', side_effect=fake_info), \
+         patch.object(service, '_generate_meme_image', side_effect=fake_image), \
+         patch.object(service, '_upload_to_image', AsyncMock(return_value="https://example.com/a.jpg")):
+        results = await service.process_news_batch_detailed(["works", "no image", "text fails"])
+
+    assert [result.status for result in results] == ["ok", "degraded", "failed"]
+    assert set(results[0].timings) == {"text", "image", "upload"}
+    assert results[1].fallback == "placeholder_image"
+    assert results[1].meme.image == "https://example.com/placeholder.jpg"
+    assert results[2].error == "model overloaded"
+    assert "text" in results[2].timings
+    # Degraded memes are not cached
+    assert await service.meme_cache.get("no image") is None
+
+def test_span_records_errors_and_in_flight():
+    """Test that a failing span counts an error and leaves nothing in flight."""
+    from app.services import metrics
+
+    errors = metrics.STAGE_ERRORS.value(stage="test_stage")
+    with pytest.raises(ValueError):
+        with metrics.span("test_stage"):
+            assert metrics.STAGE_IN_FLIGHT.value(stage="test_stage") == 1
+            raise ValueError("boom")
+
+    assert metrics.STAGE_ERRORS.value(stage="test_stage") == errors + 1
+    assert metrics.STAGE_IN_FLIGHT.value(stage="test_stage") == 0
+    assert metrics.STAGE_DURATION.count(stage="test_stage") >= 1
+
+@pytest.mark.asyncio
+async def test_open_circuit_fails_fast_then_recovers(monkeypatch):
+    """Test that an open text circuit skips the model call until the reset timeout."""
+    service = NewsToAIService()
+    service.guards["text"].breaker = CircuitBreaker("text", failure_threshold=2, reset_timeout=60)
+    call = AsyncMock(side_effect=httpx.ConnectError("refused"))
+
+    with patch.object(service.inference, 'text_generation', call):
+        for _ in range(3):
+            info = await service._generate_meme_info("Bitcoin hits ATH")
+
+    assert info["name"] == "CryptoMeme"
+    assert call.call_count == 2
+    breaker = service.guards["text"].breaker
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    # After the timeout one trial call goes through and closes the circuit
+    breaker.reset_timeout = 0
+    call = AsyncMock(return_value="NAME: MoonBrain\nTICKER: SMART\nPHRASE: hodl 🚀")
+    with patch.object(service.inference, 'text_generation', call):
+        info = await service._generate_meme_info("Bitcoin hits ATH")
+    assert info["name"] == "MoonBrain"
+    assert breaker.state == "closed"
+
+@pytest.mark.asyncio
+async def test_adaptive_limiter_increases_additively_and_backs_off():
+    """Test AIMD: slow growth on fast successes, halving on overload."""
+    limiter = AdaptiveLimiter("test", initial=2, minimum=1, maximum=4, target_latency=1.0)
+
+    await limiter.acquire()
+    await limiter.acquire()
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    limiter.release(0.1)
+    assert limiter.limit == 2.5
+    await asyncio.sleep(0)
+    assert waiter.done() and limiter.in_flight == 2
+
+    limiter.release(0.1, failed=True, overloaded=True)
+    assert limiter.limit == 1.25
+    limiter.release(5.0)
+    assert limiter.limit == 1.0
+    assert limiter.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_adaptive_limiter_passes_on_wakeup_of_cancelled_waiter():
+    """Test that a waiter cancelled right after its wakeup hands the slot on, and cancels keep the limit."""
+    limiter = AdaptiveLimiter("test", initial=1, minimum=1, maximum=4, target_latency=1.0)
+
+    await limiter.acquire()
+    first = asyncio.ensure_future(limiter.acquire())
+    second = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+
+    limiter.release(0.1, cancelled=True)
+    assert limiter.limit == 1.0
+    first.cancel()
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert first.cancelled()
+    assert second.done() and limiter.in_flight == 1
+
+def test_prompt_templates_share_static_prefix_and_version_cache_keys(monkeypatch):
+    """Test that only the prompt tail varies and a version bump changes cache keys."""
+    first = PROMPTS.render("meme_info", news="Bitcoin hits ATH")
+    second = PROMPTS.render("meme_info", news="ETH {merge} done")
+    prefix = PROMPTS.get("meme_info").prefix
+    assert first.startswith(prefix) and second.startswith(prefix)
+    assert second.endswith('"ETH {merge} done"')
+    assert "MoonBrain" in PROMPTS.render("meme_image", name="MoonBrain", news="Bitcoin hits ATH")
+
+    cache = MemeCache(redis_url="", ttl=60)
+    key = cache.key("Bitcoin hits ATH")
+    template = PROMPTS.get("meme_info")
+    monkeypatch.setitem(PROMPTS._templates, "meme_info",
+                        PromptTemplate(template.name, template.version + 1, template.prefix, template.body))
+    assert cache.key("Bitcoin hits ATH") != key
+
+@pytest.mark.asyncio
+async def test_fetch_news_merges_sources_and_collapses_near_duplicates(monkeypatch):
+    """Test concurrent sources, a per-source timeout and near-duplicate headlines."""
+    rss = """<rss><channel>
+        <item><title>Bitcoin Hits New All-Time High Above $100,000</title></item>
+        <item><title>Solana network outage halts block production</title></item>
+    </channel></rss>"""
+
+    async def handler(request):
+        if request.url.host == "api.example.com":
+            return httpx.Response(200, json={"results": [
+                {"title": "Bitcoin hits new all-time high above $100K", "source": {"title": "CryptoNews"}},
+                {"title": "Sponsored: the best exchange of 2024", "source": {"title": "Ads"}},
+                {"title": "SEC delays decision on spot Solana ETFs", "source": {"title": "CryptoNews"}},
+            ]})
+        if request.url.host == "slow.example.com":
+            await asyncio.sleep(1)
+        return httpx.Response(200, content=rss.encode())
+
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    service = NewsService()
+    service.cache.ttl = 0
+    service.sources = [
+        NewsApiSource("api", "https://api.example.com/posts", timeout=1),
+        RssSource("rss", "https://rss.example.com/feed", timeout=1),
+        RssSource("slow", "https://slow.example.com/feed", timeout=0.05),
+    ]
+
+    started = time.perf_counter()
+    news = await service.fetch_news()
+
+    assert time.perf_counter() - started < 0.5
+    assert [item["title"] for item in news] == [
+        "Bitcoin hits new all-time high above $100K",
+        "Solana network outage halts block production",
+        "SEC delays decision on spot Solana ETFs",
+    ]
+    assert news[1]["source"] == "rss"
+    await http_client.close_http_client()
+
+def test_near_duplicates_collapse_rewordings_but_keep_other_subjects():
+    """Test that reworded stories collapse while templated headlines about other entities stay."""
+    from app.services.near_duplicates import NearDuplicateIndex
+
+    reworded = [
+        ("Bitcoin hits new all-time high above $100,000", "Bitcoin reaches new all-time high above $100,000"),
+        ("BlackRock spot Bitcoin ETF records largest daily inflow since launch",
+         "BlackRock spot Bitcoin ETF sees largest daily inflow since launch"),
+        ("Bitcoin surges past $70,000 as ETF inflows grow", "Bitcoin Climbs Past $70,000 As ETF Inflows Grow"),
+        ("Ethereum developers confirm date for Dencun upgrade", "Ethereum devs confirm Dencun upgrade date"),
+        ("SEC approves spot Bitcoin ETFs", "BREAKING: SEC approves spot Bitcoin ETFs"),
+    ]
+    templated = [
+        ("Ethereum ETF approved by SEC", "Solana ETF approved by SEC"),
+        ("Binance CEO steps down amid DOJ settlement", "Coinbase CEO steps down amid SEC settlement"),
+        ("SEC delays decision on spot Solana ETFs", "SEC delays decision on spot XRP ETFs"),
+        ("SEC Delays Decision On Spot Solana ETFs", "SEC Delays Decision On Spot XRP ETFs"),
+    ]
+    for pairs, kept in ((reworded, False), (templated, True)):
+        for first, second in pairs:
+            index = NearDuplicateIndex(threshold=service_settings.NEWS_DUPLICATE_THRESHOLD)
+            assert index.add(first)
+            assert index.add(second) is kept, second
+
+@pytest.mark.asyncio
+async def test_renditions_fit_size_budgets_and_are_stored(tmp_path, monkeypatch):
+    """Test one-decode renditions under their KB budgets, stored next to the primary image."""
+    import io
+    from PIL import Image
+    from app.services import image_store
+
+    source = io.BytesIO()
+    Image.effect_mandelbrot((256, 256), (-2, -1.5, 1, 1.5), 100).save(source, format="PNG")
+    monkeypatch.setattr(service_settings, "IMAGE_EXECUTOR", "inline")
+    monkeypatch.setattr(service_settings, "IMAGE_RENDITIONS", [
+        {"name": "webp", "format": "webp", "size": 500, "max_kb": 7},
+        {"name": "thumb", "format": "webp", "size": 96, "max_kb": 0.4},
+        {"name": "legacy", "format": "bmp-nope"},
+    ])
+    monkeypatch.setattr(image_store, "_store", image_store.LocalImageStore(str(tmp_path)))
+    # Without a public URL for the local store there is nowhere to serve renditions from
+    assert [spec.name for spec in NewsToAIService().image_specs] == ["image"]
+
+    monkeypatch.setattr(service_settings, "IMAGE_STORAGE", "local")
+    monkeypatch.setattr(service_settings, "IMAGE_PUBLIC_BASE_URL", "https://memes.example.com")
+    service = NewsToAIService()
+    assert [spec.name for spec in service.image_specs] == ["image", "webp", "thumb"]
+
+    images = image_processing.render_image(source.getvalue(), service.image_specs)
+    webp = Image.open(io.BytesIO(images["webp"]))
+    assert (webp.format, webp.size) == ("WEBP", (500, 500))
+    assert len(images["webp"]) <= 7 * 1024 and len(images["thumb"]) <= 0.4 * 1024
+    assert Image.open(io.BytesIO(images["image"])).format == "JPEG"
+
+    with patch.object(service, '_generate_meme_info', AsyncMock(return_value={"name": "MoonBrain", "ticker": "SMART", "phrase": "hodl"})), \
+         patch.object(service, '_generate_meme_image', AsyncMock(return_value=images)):
+        result = await service.generate_meme_item("Bitcoin hits ATH")
+
+    assert result.meme.image.startswith("https://memes.example.com/") and result.meme.image.endswith(".jpg")
+    assert set(result.meme.images) == {"webp", "thumb"}
+    key = result.meme.images["thumb"].rsplit("/", 1)[1].split(".")[0]
+    assert await image_store.get_image_store().get(key, "webp") == images["thumb"]
+
+@pytest.mark.asyncio
+async def test_admission_sheds_load_and_serves_clients_round_robin():
+    """Test 429 per client, 503 on a full queue and round-robin hand-off."""
+    admission = AdmissionController(max_active=1, max_queue=3, max_per_client=3, queue_timeout=5)
+    order = []
+
+    async def request(client):
+        async with admission.admit(client):
+            order.append(client)
+            await asyncio.sleep(0.01)
+
+    first = await admission.acquire("a")
+    waiting = [asyncio.ensure_future(request(client)) for client in ("a", "a", "b")]
+    await asyncio.sleep(0)
+    assert admission.stats()["queued"] == 3
+
+    with pytest.raises(AdmissionRejected) as exc_info:
+        await admission.acquire("a")
+    assert exc_info.value.status_code == 429
+    with pytest.raises(AdmissionRejected) as exc_info:
+        await admission.acquire("c")
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.retry_after >= 1
+
+    first.release()
+    await asyncio.gather(*waiting)
+    assert order == ["a", "b", "a"]
+    assert admission.stats()["active"] == 0 and admission.stats()["clients"] == 0
+
+@pytest.mark.asyncio
+async def test_abandoned_generation_is_cancelled_when_last_waiter_leaves():
+    """Test that shared work survives one cancelled caller but not all of them."""
+    service = NewsToAIService()
+    service.meme_cache = MemeCache(redis_url="", ttl=60)
+    cancelled = asyncio.Event()
+
+    async def slow_generate(news):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with patch.object(service, '_generate_item', side_effect=slow_generate):
+        callers = [asyncio.ensure_future(service.generate_meme_item("Bitcoin hits ATH")) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        callers[0].cancel()
+        await asyncio.sleep(0.01)
+        assert not cancelled.is_set()
+        callers[1].cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+
+    assert len(service.inflight) == 0
+
+@pytest.mark.asyncio
+async def test_fallback_meme_text_is_degraded_and_not_cached():
+    """Test that stock fallback text is reported as degraded and regenerated next time."""
+    service = NewsToAIService()
+    service.meme_cache = MemeCache(redis_url="", ttl=60)
+    text = AsyncMock(side_effect=Exception("503"))
+
+    with patch.object(service.inference, 'text_generation', text), \
+         patch.object(service, '_generate_meme_image', AsyncMock(return_value={"image": b"image"})), \
+         patch.object(service, '_upload_to_image', AsyncMock(return_value="https://example.com/image.jpg")):
+        first = await service.generate_meme_item("Bitcoin hits ATH")
+        second = await service.generate_meme_item("Bitcoin hits ATH")
+
+    assert (first.status, first.fallback, first.meme.name) == ("degraded", "text_fallback", "CryptoMeme")
+    assert first.meme.image == "https://example.com/image.jpg"
+    assert not second.cached
+    assert await service.meme_cache.get("Bitcoin hits ATH") is None